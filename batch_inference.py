@@ -0,0 +1,118 @@
+# batch_inference.py
+
+import threading
+import time
+
+
+class _InferenceRequest:
+    """A single camera's frame waiting for a slot in the next batch."""
+
+    def __init__(self, cam_id, frame):
+        self.cam_id = cam_id
+        self.frame = frame
+        self.result = None
+        self.superseded = False
+        self.done = threading.Event()
+
+
+class BatchInferenceStage:
+    """
+    Collects the newest frame from each active camera and runs them through
+    the inference backend in one batched forward pass.
+
+    A batch is dispatched as soon as `max_batch` cameras are waiting or
+    `max_wait` seconds have passed since the first frame arrived, whichever
+    comes first. Each camera holds at most one pending slot; a newer frame
+    replaces the older one, which is released without a result.
+    """
+
+    def __init__(self, backend, max_batch=8, max_wait=0.010, **detect_kwargs):
+        self.backend = backend
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self.detect_kwargs = detect_kwargs
+
+        self._cond = threading.Condition()
+        self._pending = {}          # {cam_id: _InferenceRequest}, insertion ordered
+        self._first_pending_at = None
+        self._running = True
+
+        # Simple counters for the benchmark and for tuning max_batch/max_wait
+        self.batches = 0
+        self.frames = 0
+
+        self._thread = threading.Thread(target=self._run, name="batch-inference", daemon=True)
+        self._thread.start()
+
+    @property
+    def mean_batch_size(self):
+        return self.frames / self.batches if self.batches else 0.0
+
+    def submit(self, cam_id, frame):
+        """Queues a frame for the next batch and returns its request handle."""
+        request = _InferenceRequest(cam_id, frame)
+        with self._cond:
+            previous = self._pending.pop(cam_id, None)
+            if previous is not None:
+                previous.superseded = True
+                previous.done.set()
+            if not self._pending:
+                self._first_pending_at = time.monotonic()
+            self._pending[cam_id] = request
+            self._cond.notify_all()
+        return request
+
+    def infer(self, cam_id, frame, timeout=5.0):
+        """
+        Blocking helper used by camera pipelines.
+        Returns (boxes, scores) for this frame, or None if it was superseded.
+        """
+        request = self.submit(cam_id, frame)
+        if not request.done.wait(timeout):
+            return None
+        return request.result
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._cond.notify_all()
+        for request in pending:
+            request.done.set()
+        self._thread.join(timeout=5.0)
+
+    def _next_batch(self):
+        with self._cond:
+            while self._running:
+                if not self._pending:
+                    self._cond.wait()
+                    continue
+                remaining = self._first_pending_at + self.max_wait - time.monotonic()
+                if len(self._pending) >= self.max_batch or remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            if not self._running:
+                return []
+
+            cam_ids = list(self._pending)[:self.max_batch]
+            batch = [self._pending.pop(cam_id) for cam_id in cam_ids]
+            self._first_pending_at = time.monotonic() if self._pending else None
+            return batch
+
+    def _run(self):
+        while self._running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                results = self.backend.detect([request.frame for request in batch], **self.detect_kwargs)
+                for request, result in zip(batch, results):
+                    request.result = result
+                self.batches += 1
+                self.frames += len(batch)
+            except Exception as e:
+                print(f"[ERROR] Batched inference failed for {len(batch)} frames: {e}")
+            finally:
+                for request in batch:
+                    request.done.set()
@@ -0,0 +1,103 @@
+# benchmarks/bench_backends.py
+"""
+Latency and accuracy of each CPU inference backend on a recorded clip.
+The first backend listed is the reference for the accuracy columns.
+
+    python benchmarks/bench_backends.py demo_video.mp4 \
+        --backend torch:yolov8n.pt --backend onnx:yolov8n.onnx \
+        --backend openvino:yolov8n_int8_openvino_model --threads 4
+
+    # Produce the exported models first:
+    python benchmarks/bench_backends.py --export onnx --int8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference_backends import create_backend, export_model
+from tracker import iou_matrix, greedy_match
+
+
+def read_clip(path, limit):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < limit:
+        success, frame = cap.read()
+        if not success:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def compare(reference, candidate, iou_threshold=0.5):
+    """Recall/precision of `candidate` boxes against the reference backend's boxes."""
+    matched = ref_total = cand_total = 0
+    score_deltas = []
+    for (ref_boxes, ref_scores), (boxes, scores) in zip(reference, candidate):
+        rows, cols = greedy_match(iou_matrix(ref_boxes, boxes), iou_threshold)
+        matched += len(rows)
+        ref_total += len(ref_boxes)
+        cand_total += len(boxes)
+        score_deltas.extend((scores[cols] - ref_scores[rows]).tolist())
+    recall = matched / ref_total if ref_total else 1.0
+    precision = matched / cand_total if cand_total else 1.0
+    return recall, precision, float(np.mean(np.abs(score_deltas))) if score_deltas else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('video', nargs='?')
+    parser.add_argument('--backend', action='append', default=[],
+                        help="name[:weights], e.g. onnx:yolov8n.onnx (repeatable)")
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--export', choices=['onnx', 'openvino'], help="export yolov8n.pt and exit")
+    parser.add_argument('--int8', action='store_true')
+    args = parser.parse_args()
+
+    if args.export:
+        print(f"[INFO] Exported to {export_model('yolov8n.pt', args.export, args.imgsz, args.int8)}")
+        return
+    if not args.video:
+        parser.error("a video clip is required unless --export is given")
+
+    frames = read_clip(args.video, args.frames)
+    specs = args.backend or ['torch']
+    reference = None
+    rows = []
+    for spec in specs:
+        name, _, weights = spec.partition(':')
+        backend = create_backend(name, weights or None, imgsz=args.imgsz, threads=args.threads)
+
+        t0 = time.perf_counter()
+        backend.warmup(1)
+        first_ms = (time.perf_counter() - t0) * 1000.0
+
+        latencies, outputs = [], []
+        for frame in frames:
+            t0 = time.perf_counter()
+            outputs.append(backend.detect(frame))
+            latencies.append((time.perf_counter() - t0) * 1000.0)
+
+        if reference is None:
+            reference = outputs
+        recall, precision, score_delta = compare(reference, outputs)
+        rows.append((spec, first_ms, np.percentile(latencies, 50), np.percentile(latencies, 95),
+                     1000.0 / np.mean(latencies), recall, precision, score_delta))
+
+    print(f"{len(frames)} frames, imgsz={args.imgsz}, threads={args.threads or 'default'}, reference={specs[0]}")
+    print(f"{'backend':<40}{'warmup':>9}{'p50 ms':>9}{'p95 ms':>9}{'FPS':>8}{'recall':>8}{'prec':>8}{'|dconf|':>9}")
+    for spec, first_ms, p50, p95, fps, recall, precision, score_delta in rows:
+        print(f"{spec:<40}{first_ms:>9.0f}{p50:>9.1f}{p95:>9.1f}{fps:>8.1f}{recall:>8.3f}{precision:>8.3f}{score_delta:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+# benchmarks/bench_batch_inference.py
+"""
+Compares aggregate detection throughput of the per-frame path (one
+model call per camera frame) against BatchInferenceStage.
+
+    python benchmarks/bench_batch_inference.py --cameras 8 --seconds 20
+    python benchmarks/bench_batch_inference.py --video demo_video.mp4 --max-batch 16
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from batch_inference import BatchInferenceStage
+from inference_backends import create_backend
+
+
+def load_frames(video_path, count, width, height):
+    """Reads frames from a clip, or builds synthetic ones when no clip is given."""
+    frames = []
+    if video_path:
+        cap = cv2.VideoCapture(video_path)
+        while len(frames) < count:
+            success, frame = cap.read()
+            if not success:
+                break
+            frames.append(frame)
+        cap.release()
+    rng = np.random.default_rng(0)
+    while len(frames) < count:
+        frames.append(rng.integers(0, 255, (height, width, 3), dtype=np.uint8))
+    return frames
+
+
+def run_cameras(cameras, seconds, infer):
+    """Runs one thread per camera calling `infer` and returns total frames processed."""
+    counts = [0] * cameras
+    deadline = time.monotonic() + seconds
+
+    def worker(index):
+        frame_index = 0
+        while time.monotonic() < deadline:
+            if infer(index, frame_index) is not None:
+                counts[index] += 1
+            frame_index += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(cameras)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', default='torch', choices=['torch', 'onnx', 'openvino'])
+    parser.add_argument('--weights', default=None)
+    parser.add_argument('--video', default=None, help="clip to sample frames from (synthetic if omitted)")
+    parser.add_argument('--cameras', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=15.0)
+    parser.add_argument('--max-batch', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10.0)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, 64, args.width, args.height)
+    backend = create_backend(args.backend, args.weights)
+    backend.warmup()
+
+    lock = threading.Lock()
+
+    def per_frame(cam, i):
+        with lock:
+            return backend.detect(frames[(cam + i) % len(frames)])
+
+    print(f"[BENCH] per-frame path, {args.cameras} cameras, {args.seconds:.0f}s ...")
+    single_total = run_cameras(args.cameras, args.seconds, per_frame)
+    single_fps = single_total / args.seconds
+
+    stage = BatchInferenceStage(backend, args.max_batch, args.max_wait_ms / 1000.0)
+
+    def batched(cam, i):
+        return stage.infer(cam, frames[(cam + i) % len(frames)])
+
+    print(f"[BENCH] batched path, max_batch={args.max_batch}, max_wait={args.max_wait_ms}ms ...")
+    batch_total = run_cameras(args.cameras, args.seconds, batched)
+    batch_fps = batch_total / args.seconds
+    stage.stop()
+
+    print()
+    print(f"{'path':<12}{'frames':>10}{'agg FPS':>10}{'per cam':>10}")
+    print(f"{'per-frame':<12}{single_total:>10}{single_fps:>10.1f}{single_fps / args.cameras:>10.1f}")
+    print(f"{'batched':<12}{batch_total:>10}{batch_fps:>10.1f}{batch_fps / args.cameras:>10.1f}")
+    print(f"mean batch size: {stage.mean_batch_size:.2f}")
+    if single_fps:
+        print(f"speedup: {batch_fps / single_fps:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# benchmarks/bench_crossing.py
+"""
+Micro-benchmark: per-pair shapely LineString.intersects() against the
+vectorised FenceCrossingEngine, on random movements and fence segments.
+
+    python benchmarks/bench_crossing.py --tracks 500 --segments 40
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from shapely.geometry import LineString
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fence_geometry import FenceCrossingEngine
+
+
+def shapely_crossings(starts, ends, segments):
+    """The original per-track, per-segment check."""
+    fence_lines = [LineString([(s[0], s[1]), (s[2], s[3])]) for s in segments]
+    crossed = []
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        movement_line = LineString([tuple(start), tuple(end)])
+        for fence_line in fence_lines:
+            if movement_line.intersects(fence_line):
+                crossed.append(i)
+                break
+    return crossed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tracks', type=int, default=300)
+    parser.add_argument('--segments', type=int, default=30)
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    segments = rng.uniform(0, 1920, (args.segments, 4)).astype(np.float32)
+    engine = FenceCrossingEngine(segments)
+    frames = []
+    for _ in range(args.frames):
+        starts = rng.uniform(0, 1920, (args.tracks, 2)).astype(np.float32)
+        ends = starts + rng.normal(0, 25, (args.tracks, 2)).astype(np.float32)
+        frames.append((starts, ends))
+
+    t0 = time.perf_counter()
+    shapely_results = [shapely_crossings(s, e, segments) for s, e in frames]
+    shapely_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vector_results = [engine.crossings(s, e)[0].tolist() for s, e in frames]
+    vector_time = time.perf_counter() - t0
+
+    mismatches = sum(a != b for a, b in zip(shapely_results, vector_results))
+    crossings = sum(len(r) for r in vector_results)
+
+    print(f"{args.tracks} tracks x {args.segments} segments, {args.frames} frames, {crossings} crossings")
+    print(f"{'shapely':<12}{shapely_time / args.frames * 1000:>10.3f} ms/frame")
+    print(f"{'vectorised':<12}{vector_time / args.frames * 1000:>10.3f} ms/frame")
+    print(f"speedup: {shapely_time / vector_time:.1f}x, frames with differing results: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# benchmarks/bench_detection_workers.py
+"""
+Aggregate detection throughput of the in-process model (one shared backend
+behind a lock) against DetectionWorkerPool with an increasing number of
+worker processes. Frames reach the workers through shared memory.
+
+    python benchmarks/bench_detection_workers.py --cameras 8 --workers 1 2 4 --seconds 15
+    python benchmarks/bench_detection_workers.py --backend onnx --weights yolov8n.onnx
+"""
+
+import argparse
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bench_batch_inference import load_frames, run_cameras
+from detection_workers import DetectionWorkerPool
+from inference_backends import create_backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', default='torch', choices=['torch', 'onnx', 'openvino'])
+    parser.add_argument('--weights', default=None)
+    parser.add_argument('--video', default=None, help="clip to sample frames from (synthetic if omitted)")
+    parser.add_argument('--cameras', type=int, default=8)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, default=0, help="threads per worker (0 = cores / workers)")
+    parser.add_argument('--seconds', type=float, default=15.0)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=480)
+    args = parser.parse_args()
+
+    frames = load_frames(args.video, 64, args.width, args.height)
+    full_frame = [(0, 0, args.width, args.height)]
+    rows = []
+
+    backend = create_backend(args.backend, args.weights)
+    backend.warmup()
+    lock = threading.Lock()
+
+    def in_process(cam, i):
+        with lock:
+            return backend.detect(frames[(cam + i) % len(frames)])
+
+    print(f"[BENCH] in-process, {args.cameras} cameras, {args.seconds:.0f}s ...")
+    total = run_cameras(args.cameras, args.seconds, in_process)
+    rows.append(('in-process', total))
+    del backend
+
+    for workers in args.workers:
+        pool = DetectionWorkerPool(workers, args.backend, args.weights, threads=args.threads)
+
+        def pooled(cam, i):
+            return pool.infer(f"cam{cam}", frames[(cam + i) % len(frames)], full_frame)
+
+        print(f"[BENCH] {workers} worker(s), {pool.threads} threads each ...")
+        total = run_cameras(args.cameras, args.seconds, pooled)
+        rows.append((f"{workers} worker(s)", total))
+        pool.stop()
+
+    print()
+    baseline = rows[0][1] / args.seconds
+    print(f"{'path':<16}{'frames':>10}{'agg FPS':>10}{'per cam':>10}{'speedup':>10}")
+    for name, total in rows:
+        fps = total / args.seconds
+        speedup = fps / baseline if baseline else 0.0
+        print(f"{name:<16}{total:>10}{fps:>10.1f}{fps / args.cameras:>10.1f}{speedup:>9.2f}x")
+    print(f"cores: {os.cpu_count()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_enhancement.py
+"""
+Times the 'quality' and 'fast' enhancement presets on the same snapshots and
+measures how close the fast output stays to the quality output (PSNR in dB
+and SSIM on the luma channel; higher is closer, SSIM 1.0 = identical).
+
+Uses the given snapshots, or a synthetic noisy 1280x720 scene when none are
+given. --threads sets the fast preset's tile threads (default: all cores).
+With --box (or always for the synthetic scene) the quality preset is also
+timed in ROI mode, enhancing only that intruder box at full cost.
+
+    python benchmarks/bench_enhancement.py
+    python benchmarks/bench_enhancement.py static/intrusion_snaps/*.jpg --runs 3 --threads 4
+    python benchmarks/bench_enhancement.py snap.jpg --box 560,200,720,560
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from image_enhancement import ImageEnhancer
+
+
+def synthetic_snapshot(path, width=1280, height=720, seed=0):
+    """Gradient background, a few solid shapes and sensor-like noise."""
+    rng = np.random.default_rng(seed)
+    ramp = np.linspace(40, 200, width, dtype=np.float32)
+    image = np.repeat(np.repeat(ramp[None, :, None], height, axis=0), 3, axis=2)
+    for _ in range(12):
+        x, y = int(rng.integers(0, width - 120)), int(rng.integers(0, height - 240))
+        cv2.rectangle(image, (x, y), (x + 60 + int(rng.integers(60)), y + 120 + int(rng.integers(120))),
+                      [float(c) for c in rng.integers(0, 255, 3)], -1)
+    image += rng.normal(0, 12, image.shape)
+    cv2.imwrite(path, np.clip(image, 0, 255).astype(np.uint8))
+
+
+def ssim(a, b):
+    """Mean SSIM of the luma channels with the usual 11x11, sigma 1.5 Gaussian window."""
+    a = cv2.cvtColor(a, cv2.COLOR_BGR2GRAY).astype(np.float64)
+    b = cv2.cvtColor(b, cv2.COLOR_BGR2GRAY).astype(np.float64)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    blur = lambda x: cv2.GaussianBlur(x, (11, 11), 1.5)
+    mu_a, mu_b = blur(a), blur(b)
+    var_a = blur(a * a) - mu_a ** 2
+    var_b = blur(b * b) - mu_b ** 2
+    cov = blur(a * b) - mu_a * mu_b
+    ssim_map = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(ssim_map.mean())
+
+
+def time_mode(enhancer, path, mode, runs, roi=None):
+    output = enhancer.enhance(path, mode=mode, roi=roi)     # Warm-up; also allocates fast-mode buffers
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        enhancer.enhance(path, mode=mode, roi=roi)
+        timings.append(time.perf_counter() - start)
+    return output, np.array(timings) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('images', nargs='*', help="snapshot files (default: one synthetic 1280x720 scene)")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--tile-rows', type=int, default=256)
+    parser.add_argument('--box', help="intruder box x1,y1,x2,y2 for the ROI-mode column")
+    args = parser.parse_args()
+
+    box = tuple(int(v) for v in args.box.split(',')) if args.box else None
+    images = args.images
+    if not images:
+        images = [os.path.join(tempfile.mkdtemp(), 'synthetic.jpg')]
+        synthetic_snapshot(images[0])
+        box = box or (560, 200, 720, 560)      # A standing person near the middle
+
+    enhancer = ImageEnhancer(tile_rows=args.tile_rows, threads=args.threads)
+    single = ImageEnhancer(tile_rows=args.tile_rows, threads=1)
+    print(f"{'image':<32} {'quality ms':>11} {'fast ms':>9} {'1-thread':>9} {'speedup':>8} {'PSNR dB':>8} "
+          f"{'SSIM':>7} {'ROI ms':>7}")
+    speedups = []
+    for path in images:
+        quality, quality_ms = time_mode(enhancer, path, 'quality', args.runs)
+        fast, fast_ms = time_mode(enhancer, path, 'fast', args.runs)
+        _, single_ms = time_mode(single, path, 'fast', args.runs)
+        if quality is None or fast is None:
+            print(f"{os.path.basename(path):<32} could not be read")
+            continue
+        roi_ms = time_mode(enhancer, path, 'quality', args.runs, roi=box)[1].mean() if box else None
+        speedup = quality_ms.mean() / fast_ms.mean()
+        speedups.append(speedup)
+        print(f"{os.path.basename(path)[:32]:<32} {quality_ms.mean():>11.0f} {fast_ms.mean():>9.0f} "
+              f"{single_ms.mean():>9.0f} {speedup:>7.1f}x {cv2.PSNR(quality, fast):>8.2f} {ssim(quality, fast):>7.4f} "
+              f"{roi_ms if roi_ms is not None else float('nan'):>7.0f}")
+    if len(speedups) > 1:
+        print(f"mean speedup {np.mean(speedups):.1f}x over {len(speedups)} images "
+              f"({enhancer.threads} tile threads)")
+
+
+if __name__ == '__main__':
+    main()
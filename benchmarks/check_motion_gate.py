@@ -0,0 +1,94 @@
+# benchmarks/check_motion_gate.py
+"""
+Regression check for motion gating: replays a low-contrast person (gray 76
+on a gray 60 background, with sensor noise) walking across the fence,
+between stretches of empty scene, with a scripted detector, once with
+MOTION_GATING off and once on. The gate has to skip the empty stretches
+without costing crossing events or splitting the track.
+
+Exits with code 1 if the gated run logs a different number of crossings
+than the ungated one, logs none at all, produces more than one track ID,
+or skips fewer than half of the empty frames.
+
+    python benchmarks/check_motion_gate.py
+    python benchmarks/check_motion_gate.py --person-gray 120 --idle-frames 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from run_suite import WIDTH, HEIGHT, CAM_ID, make_manager
+
+FENCE_DATA = {
+    'line_x1': 320, 'line_y1': 0, 'line_x2': 320, 'line_y2': 480,
+    'segments': [[320, 0, 320, 480]],
+    'zones': [],
+}
+
+
+def replay(args, gating):
+    """Runs the walk through a fresh DetectionManager; returns (crossings, track ids, gate stats)."""
+    manager = make_manager(
+        SimpleNamespace(detector='stub', weights=None, motion_gating=gating),
+        tempfile.mkdtemp(prefix='vf-gate-'),
+    )
+    rng = np.random.default_rng(args.seed)
+    track_ids = set()
+    for i in range(args.idle_frames + args.frames + args.idle_frames):
+        frame = np.full((HEIGHT, WIDTH, 3), args.background_gray, dtype=np.float32)
+        step = i - args.idle_frames
+        x = 40 + step * args.speed
+        box = np.array([[x, 200, x + 40, 300]], dtype=np.float32)
+        if 0 <= step < args.frames and x + 40 < WIDTH:
+            frame[200:300, int(x):int(x) + 40] = args.person_gray
+            manager.backend.current = box
+        else:
+            manager.backend.current = np.zeros((0, 4), dtype=np.float32)
+        frame += rng.normal(0, args.noise, frame.shape)
+        manager.detect_and_track(np.clip(frame, 0, 255).astype(np.uint8), FENCE_DATA, CAM_ID, render=False)
+        tracker = manager.trackers.get(CAM_ID)
+        if tracker is not None:
+            track_ids.update(int(t) for t in tracker.ids)
+    manager.event_writer.stop()
+    gate = manager.motion_gates.get(CAM_ID)
+    return manager.event_writer.written, track_ids, gate.stats() if gate is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=250, help="frames of the walk itself")
+    parser.add_argument('--idle-frames', type=int, default=150, help="empty frames before and after the walk")
+    parser.add_argument('--speed', type=float, default=2.5, help="pixels per frame")
+    parser.add_argument('--background-gray', type=int, default=60)
+    parser.add_argument('--person-gray', type=int, default=76)
+    parser.add_argument('--noise', type=float, default=3.0, help="sensor noise sigma in gray levels")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    baseline, baseline_ids, _ = replay(args, gating=False)
+    gated, gated_ids, gate = replay(args, gating=True)
+    print(f"gating off: {baseline} crossing event(s), track ids {sorted(baseline_ids)}")
+    print(f"gating on:  {gated} crossing event(s), track ids {sorted(gated_ids)}, "
+          f"skipped {gate['skipped']}/{gate['frames']} frames")
+
+    failures = []
+    if gated == 0 or gated != baseline:
+        failures.append("gating changed the crossing events")
+    if len(gated_ids) > max(1, len(baseline_ids)):
+        failures.append("gating split the track")
+    if gate['skipped'] < args.idle_frames:
+        failures.append(f"gating skipped {gate['skipped']} frames, expected at least {args.idle_frames} "
+                        f"of the {2 * args.idle_frames} empty ones")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
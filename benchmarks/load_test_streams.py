@@ -0,0 +1,123 @@
+# benchmarks/load_test_streams.py
+"""
+Opens N concurrent MJPEG clients against a stream endpoint and reports the
+frame rate each client received and the server's memory.
+
+Server RSS is read from the async server's /stream_stats, or from
+/proc/<pid> when --pid is given (e.g. for the Flask dev server).
+
+    STREAM_SERVER_PORT=5001 python run.py monitor &
+    python benchmarks/load_test_streams.py http://localhost:5001/video_feed_detect/0 --clients 300
+    python benchmarks/load_test_streams.py "http://localhost:5000/video_feed_detect/0?fps=5" --clients 50 --pid 1234
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+BOUNDARY = b'--frame'
+
+
+async def fetch_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+def read_rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024.0
+    return None
+
+
+async def client(host, port, target, deadline, frames, started, index):
+    """Reads the stream until the deadline, counting multipart boundaries."""
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    started[index] = time.monotonic()
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    tail = b''
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                data = await asyncio.wait_for(reader.read(65536), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if not data:
+                break
+            data = tail + data
+            frames[index] += data.count(BOUNDARY)
+            tail = data[-len(BOUNDARY) + 1:]    # A boundary may straddle two reads
+    finally:
+        writer.close()
+
+
+async def sample_rss(host, port, pid, deadline, samples):
+    while time.monotonic() < deadline:
+        try:
+            if pid:
+                samples.append(read_rss_mb(pid))
+            else:
+                samples.append((await fetch_json(host, port, '/stream_stats'))['rss_mb'])
+        except (OSError, KeyError, ValueError):
+            pass
+        await asyncio.sleep(1.0)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('url', help="stream URL, e.g. http://localhost:5001/video_feed_detect/0?scale=0.5")
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--seconds', type=float, default=20.0)
+    parser.add_argument('--ramp', type=float, default=2.0, help="seconds over which clients connect")
+    parser.add_argument('--pid', type=int, default=0, help="read server RSS from /proc/<pid> instead of /stream_stats")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    target = url.path + (f"?{url.query}" if url.query else '')
+
+    rss_samples = []
+    start = time.monotonic()
+    deadline = start + args.ramp + args.seconds
+    frames = [0] * args.clients
+    started = [deadline] * args.clients     # Clients that never connect get no time window
+    tasks = [asyncio.create_task(sample_rss(host, port, args.pid, deadline, rss_samples))]
+    for i in range(args.clients):
+        tasks.append(asyncio.create_task(client(host, port, target, deadline, frames, started, i)))
+        await asyncio.sleep(args.ramp / args.clients)
+    await asyncio.gather(*tasks)
+
+    # Each client's rate is over its own connected time
+    connected = np.maximum(deadline - np.array(started), 1e-9)
+    fps = np.where(np.array(started) < deadline, np.array(frames) / connected, 0.0)
+    rss = [r for r in rss_samples if r is not None]
+    print(f"{args.clients} clients for {args.seconds:.0f}s, url={args.url}")
+    print(f"per-client FPS: min {fps.min():.1f}  p5 {np.percentile(fps, 5):.1f}  "
+          f"median {np.median(fps):.1f}  max {fps.max():.1f}")
+    print(f"clients with no frames: {int((fps == 0).sum())}")
+    if rss:
+        print(f"server RSS: start {rss[0]:.1f} MB  peak {max(rss):.1f} MB  "
+              f"per client ~{(max(rss) - rss[0]) * 1024 / args.clients:.0f} KB")
+
+
+if __name__ == '__main__':
+    if os.name == 'nt':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main())
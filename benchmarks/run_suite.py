@@ -0,0 +1,415 @@
+# benchmarks/run_suite.py
+"""
+Offline, reproducible benchmark suite: no cameras, network or model weights.
+
+Cases
+  pipeline    DetectionManager.detect_and_track + FrameEncoder on a synthetic
+              scene of people walking across scripted fences and a zone
+  headless    the same with render=False (no overlay, no encode)
+  crossing    FenceCrossingEngine.crossings on many tracks and segments
+  enhance     ImageEnhancer.enhance on a synthetic snapshot
+
+The detector is a scripted stub that returns the scene's true boxes with
+jitter; pass --detector torch|onnx|openvino (and --weights) to time a real
+model on the same frames. Each case runs --repeats times; the reported FPS
+is the best repeat and each stage percentile the lowest across repeats, so
+one slow run on a busy machine does not decide the result. A short
+calibration workload is timed before every repeat, and the comparison
+scales the baseline by the change in that time, so a machine that is
+slower overall does not read as a regression. Results (FPS,
+per-stage p50/p95/p99 in ms, peak traced memory) are written as JSON.
+
+With --baseline, any case whose FPS drops by more than --tolerance fails
+the run with exit code 1, as does a stage whose p95 rises by more than
+--tolerance and by more than --floor-ms. Stages whose baseline p50 is
+under --floor-ms, and the event writer's background-thread stages
+(BACKGROUND_STAGES), are reported but not gated: their p95 measures
+preemption by other threads more than the stage itself.
+
+    python benchmarks/run_suite.py --output results.json
+    python benchmarks/run_suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/run_suite.py --baseline benchmarks/baseline.json --tolerance 0.25
+
+Timings only compare on the same hardware. The committed
+benchmarks/baseline.json was recorded on the machine described in its
+'meta' block; on any other machine, first record a local baseline with
+--save-baseline (on the commit you compare against), then run --baseline.
+A warning is printed when the baseline's machine differs from this one.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import inference_backends
+from inference_backends import InferenceBackend
+from metrics import METRICS
+
+WIDTH, HEIGHT = 640, 480
+# Timed on the event writer thread, so they measure the scheduler as much as the code
+BACKGROUND_STAGES = ('db_commit', 'snapshot_write', 'thumbnail_write')
+CAM_ID = 'bench'
+FENCE_DATA = {
+    'line_x1': 320, 'line_y1': 0, 'line_x2': 320, 'line_y2': 480,
+    'segments': [[320, 0, 320, 480], [0, 240, 200, 240], [440, 100, 640, 300]],
+    'zones': [{'id': 1, 'name': 'gate', 'points': [[40, 300], [260, 300], [260, 460], [40, 460]],
+               'frame_width': WIDTH, 'frame_height': HEIGHT}],
+}
+
+
+class ScriptedDetector(InferenceBackend):
+    """Stub backend: returns the boxes the scene put in `current`, with a little jitter."""
+
+    name = 'stub'
+
+    def __init__(self, weights=None, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.current = np.zeros((0, 4), dtype=np.float32)
+        self.rng = np.random.default_rng(seed)
+
+    def detect(self, images, imgsz=None, conf=None):
+        single = not isinstance(images, list)
+        boxes = self.current + self.rng.normal(0, 1.5, self.current.shape).astype(np.float32)
+        scores = np.full(len(boxes), 0.85, dtype=np.float32)
+        detections = [(boxes, scores) for _ in ([images] if single else images)]
+        return detections[0] if single else detections
+
+
+class SyntheticScene:
+    """People as 40x100 boxes moving on straight lines and bouncing off the frame edges."""
+
+    def __init__(self, people=12, seed=0):
+        rng = np.random.default_rng(seed)
+        self.pos = rng.uniform([0, 0], [WIDTH - 40, HEIGHT - 100], (people, 2))
+        self.vel = rng.uniform(-6, 6, (people, 2))
+        self.colors = rng.integers(40, 255, (people, 3))
+        self.background = np.full((HEIGHT, WIDTH, 3), 90, dtype=np.uint8)
+        cv2.putText(self.background, "synthetic", (20, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (140, 140, 140), 2)
+
+    def step(self):
+        self.pos += self.vel
+        limits = np.array([WIDTH - 40, HEIGHT - 100])
+        bounce = (self.pos < 0) | (self.pos > limits)
+        self.vel[bounce] *= -1
+        self.pos = np.clip(self.pos, 0, limits)
+        boxes = np.hstack([self.pos, self.pos + [40, 100]]).astype(np.float32)
+        frame = self.background.copy()
+        for (x1, y1, x2, y2), color in zip(boxes.astype(int), self.colors):
+            cv2.rectangle(frame, (x1, y1), (x2, y2), tuple(int(c) for c in color), -1)
+        return frame, boxes
+
+
+class StageRecorder:
+    """Captures raw METRICS samples so the suite can report exact percentiles."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self._observe = METRICS.observe
+
+    def __enter__(self):
+        METRICS.observe = lambda cam_id, stage, seconds: self.samples[stage].append(seconds * 1000.0)
+        return self
+
+    def __exit__(self, *exc):
+        METRICS.observe = self._observe
+
+
+def percentiles(values):
+    values = np.asarray(values)
+    return {f"p{q}": round(float(np.percentile(values, q)), 3) for q in (50, 95, 99)} if len(values) else {}
+
+
+def make_manager(args, snapshot_dir):
+    """A DetectionManager on an in-memory database, with the scripted or a real detector."""
+    from flask import Flask
+    from extensions import db
+    import models  # noqa: F401  (registers the tables)
+    from detection_utils import DetectionManager
+
+    # Snapshots and thumbnails (rooted at the static folder) both go to the temp dir
+    app = Flask(__name__, static_folder=snapshot_dir)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI='sqlite://', SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        INFERENCE_BACKEND=args.detector, INFERENCE_WEIGHTS=args.weights or ('scripted' if args.detector == 'stub' else None),
+        INFERENCE_WARMUP_RUNS=1, MOTION_GATING=args.motion_gating, ZONE_DWELL_SECONDS=2.0,
+    )
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+    inference_backends.BACKENDS['stub'] = ScriptedDetector
+    manager = DetectionManager(app)
+    manager.event_writer.snapshot_dir = snapshot_dir
+    return manager
+
+
+def run_pipeline(args, render, snapshot_dir):
+    from output_stage import FrameEncoder
+    manager = make_manager(args, snapshot_dir)
+    scene = SyntheticScene(args.people, args.seed)
+    encoder = FrameEncoder(quality=80)
+
+    def one_frame():
+        frame, boxes = scene.step()
+        if args.detector == 'stub':
+            manager.backend.current = boxes
+        start = time.perf_counter()
+        output = manager.detect_and_track(frame, FENCE_DATA, CAM_ID, render=render)
+        if output is not None:
+            with METRICS.timed(CAM_ID, 'encode'):
+                encoder.encode(output)
+        return time.perf_counter() - start
+
+    for _ in range(args.warmup):
+        one_frame()
+    with StageRecorder() as recorder:
+        total = sum(one_frame() for _ in range(args.frames))
+
+    tracemalloc.start()
+    for _ in range(args.memory_frames):
+        one_frame()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    manager.event_writer.stop()
+    if manager.worker_pool is not None:
+        manager.worker_pool.stop()
+
+    stages = {stage: percentiles(values) for stage, values in sorted(recorder.samples.items())}
+    return {
+        'frames': args.frames,
+        'fps': round(args.frames / total, 2),
+        'stages_ms': stages,
+        'peak_traced_mb': round(peak / 2 ** 20, 2),
+        'events_written': manager.event_writer.written,
+    }
+
+
+def run_crossing(args):
+    from fence_geometry import FenceCrossingEngine
+    rng = np.random.default_rng(args.seed)
+    engine = FenceCrossingEngine(rng.uniform(0, 1000, (30, 4)).tolist())
+    starts = rng.uniform(0, 1000, (300, 2))
+    timings = []
+    for _ in range(args.warmup + args.frames):
+        ends = starts + rng.normal(0, 15, starts.shape)
+        start = time.perf_counter()
+        engine.crossings(starts, ends)
+        timings.append(time.perf_counter() - start)
+        starts = ends
+    timings = timings[args.warmup:]
+    tracemalloc.start()
+    engine.crossings(starts, starts + 10)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'frames': args.frames,
+        'fps': round(len(timings) / sum(timings), 2),
+        'stages_ms': {'crossing': percentiles(np.array(timings) * 1000.0)},
+        'peak_traced_mb': round(peak / 2 ** 20, 2),
+    }
+
+
+def run_enhance(args, workdir):
+    from image_enhancement import ImageEnhancer
+    frame, _ = SyntheticScene(args.people, args.seed).step()
+    noisy = np.clip(frame + np.random.default_rng(args.seed).normal(0, 12, frame.shape), 0, 255).astype(np.uint8)
+    path = os.path.join(workdir, 'enhance_input.jpg')
+    cv2.imwrite(path, noisy)
+    enhancer = ImageEnhancer()
+    enhancer.enhance(path)
+    timings = []
+    for _ in range(args.enhance_runs):
+        start = time.perf_counter()
+        enhancer.enhance(path)
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    enhancer.enhance(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'frames': args.enhance_runs,
+        'fps': round(len(timings) / sum(timings), 3),
+        'stages_ms': {'enhance': percentiles(np.array(timings) * 1000.0)},
+        'peak_traced_mb': round(peak / 2 ** 20, 2),
+    }
+
+
+def calibrate(rounds=5):
+    """
+    Milliseconds for a fixed mix of OpenCV and interpreter work, best of
+    `rounds`. Measured next to every repeat so the comparison can tell a
+    slower build from a machine that is slower right now (shared VMs lose
+    a third of their speed for minutes at a time).
+    """
+    image = np.random.default_rng(0).integers(0, 255, (HEIGHT, WIDTH, 3), dtype=np.uint8)
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(4):
+            cv2.GaussianBlur(image, (9, 9), 0)
+        sum(i * i for i in range(20000))
+        best = min(best, time.perf_counter() - start)
+    return best * 1000.0
+
+
+def best_of(runs):
+    """Combines repeats of one case: best FPS and best (lowest) value of each stage percentile."""
+    result = dict(max(runs, key=lambda run: run['fps']))
+    result['fps_runs'] = [run['fps'] for run in runs]
+    result['calibration_ms'] = round(min(run['calibration_ms'] for run in runs), 3)
+    stages = {}
+    for stage in result['stages_ms']:
+        samples = [run['stages_ms'].get(stage, {}) for run in runs]
+        stages[stage] = {q: min(s[q] for s in samples if q in s)
+                         for q in result['stages_ms'][stage]}
+    result['stages_ms'] = stages
+    return result
+
+
+def compare(results, baseline, tolerance, floor_ms=1.0):
+    """
+    Returns a list of human-readable regressions against the baseline. The
+    baseline's numbers are first scaled by how much slower the calibration
+    workload ran this time than when the baseline was recorded. A faster
+    machine does not tighten the gate: tail latencies do not shrink with it.
+    """
+    regressions = []
+    for case, current in results['cases'].items():
+        previous = baseline.get('cases', {}).get(case)
+        if previous is None:
+            continue
+        slowdown = 1.0
+        if previous.get('calibration_ms') and current.get('calibration_ms'):
+            slowdown = max(1.0, current['calibration_ms'] / previous['calibration_ms'])
+        expected_fps = previous['fps'] / slowdown
+        if current['fps'] < expected_fps * (1 - tolerance):
+            regressions.append(f"{case}: FPS {previous['fps']} -> {current['fps']} "
+                               f"(expected >= {expected_fps * (1 - tolerance):.1f} at {slowdown:.2f}x machine speed)")
+        for stage, stats in current['stages_ms'].items():
+            if stage in BACKGROUND_STAGES:
+                continue
+            recorded = previous.get('stages_ms', {}).get(stage, {})
+            before, after = recorded.get('p95'), stats.get('p95')
+            if before is None or after is None or recorded.get('p50', 0.0) < floor_ms:
+                continue
+            expected = before * slowdown
+            if after > expected * (1 + tolerance) and after - expected > floor_ms:
+                regressions.append(f"{case}/{stage}: p95 {before} ms -> {after} ms "
+                                   f"(at {slowdown:.2f}x machine speed)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', default=['pipeline', 'headless', 'crossing', 'enhance'],
+                        choices=['pipeline', 'headless', 'crossing', 'enhance'])
+    parser.add_argument('--detector', default='stub', choices=['stub', 'torch', 'onnx', 'openvino'])
+    parser.add_argument('--weights', default=None)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=30)
+    parser.add_argument('--memory-frames', type=int, default=30, help="frames in the separate tracemalloc pass")
+    parser.add_argument('--enhance-runs', type=int, default=5)
+    parser.add_argument('--people', type=int, default=12)
+    parser.add_argument('--motion-gating', action='store_true')
+    parser.add_argument('--threads', type=int, default=1, help="OpenCV threads (fixed for repeatability)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="write results JSON here (stdout if omitted)")
+    parser.add_argument('--baseline', default=None, help="baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--floor-ms', type=float, default=1.0,
+                        help="stages with a baseline p50 below this, or rising by less, are not gated")
+    parser.add_argument('--repeats', type=int, default=5, help="runs per case; the best FPS and stage times are kept")
+    parser.add_argument('--save-baseline', default=None, help="also write the results as a new baseline")
+    args = parser.parse_args()
+
+    cv2.setNumThreads(args.threads)
+    workdir = tempfile.mkdtemp(prefix='vf-bench-')
+    results = {
+        'meta': {
+            'python': platform.python_version(), 'opencv': cv2.__version__, 'numpy': np.__version__,
+            'machine': platform.machine(), 'cpu': _cpu_model(), 'cpus': os.cpu_count(), 'detector': args.detector,
+            'frames': args.frames, 'repeats': args.repeats, 'seed': args.seed, 'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'cases': {},
+    }
+    # Repeats are interleaved across cases so a slow spell on the machine
+    # costs every case one repeat instead of all repeats of one case
+    runs = defaultdict(list)
+    for repeat in range(max(1, args.repeats)):
+        for case in args.cases:
+            print(f"[BENCH] {case} ({repeat + 1}/{args.repeats}) ...", file=sys.stderr)
+            calibration_ms = calibrate()
+            if case == 'pipeline':
+                run = run_pipeline(args, True, workdir)
+            elif case == 'headless':
+                run = run_pipeline(args, False, workdir)
+            elif case == 'crossing':
+                run = run_crossing(args)
+            else:
+                run = run_enhance(args, workdir)
+            run['calibration_ms'] = calibration_ms
+            runs[case].append(run)
+    for case in args.cases:
+        results['cases'][case] = best_of(runs[case])
+        print(f"[BENCH] {case}: {results['cases'][case]['fps']} FPS (runs: {results['cases'][case]['fps_runs']})",
+              file=sys.stderr)
+    results['meta']['peak_rss_mb'] = round(_peak_rss_mb(), 1)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text + '\n')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        recorded_on = baseline.get('meta', {})
+        if any(recorded_on.get(key) != results['meta'][key] for key in ('machine', 'cpu', 'cpus')):
+            print(f"[WARN] {args.baseline} was recorded on a different machine "
+                  f"({recorded_on.get('cpu')}, {recorded_on.get('cpus')} CPUs); "
+                  f"re-record it here with --save-baseline for a meaningful comparison", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance, args.floor_ms)
+        for line in regressions:
+            print(f"[REGRESSION] {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"[BENCH] No regressions beyond {args.tolerance:.0%} of {args.baseline}", file=sys.stderr)
+
+
+def _cpu_model():
+    """CPU model name from /proc/cpuinfo, else whatever platform reports."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024.0
+    except ImportError:
+        return 0.0
+
+
+if __name__ == '__main__':
+    main()
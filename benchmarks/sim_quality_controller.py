@@ -0,0 +1,72 @@
+# benchmarks/sim_quality_controller.py
+"""
+Drives QualityController with a synthetic slow model whose latency grows
+with the square of the input size and with a host load factor that
+changes over time, and checks that the per-frame cost is brought back under
+budget after each load step. Runs without model weights or cameras.
+
+    python benchmarks/sim_quality_controller.py --target-fps 10 --base-ms 150
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from quality_controller import QualityController
+
+
+class SyntheticSlowModel:
+    """Latency = base_ms * load * (imgsz / 640)^2, with a little noise."""
+
+    def __init__(self, base_ms, seed=0):
+        self.base_ms = base_ms
+        self.load = 1.0
+        self.rng = np.random.default_rng(seed)
+
+    def infer(self, imgsz):
+        return self.base_ms * self.load * (imgsz / 640.0) ** 2 * self.rng.uniform(0.95, 1.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target-fps', type=float, default=10.0)
+    parser.add_argument('--base-ms', type=float, default=150.0, help="latency at 640px with no extra load")
+    parser.add_argument('--frames', type=int, default=3000)
+    args = parser.parse_args()
+
+    model = SyntheticSlowModel(args.base_ms)
+    controller = QualityController(target_fps=args.target_fps)
+    # Load schedule: (starting frame, load factor)
+    schedule = [(0, 1.0), (args.frames // 3, 3.0), (2 * args.frames // 3, 0.3)]
+
+    phase_costs = {load: [] for _, load in schedule}
+    for frame in range(args.frames):
+        for start, load in schedule:
+            if frame == start:
+                model.load = load
+                print(f"frame {frame:>5}: load x{load}")
+        if not controller.should_process():
+            continue
+        latency = model.infer(controller.imgsz)
+        controller.record(latency)
+        phase_costs[model.load].append(latency / controller.stride)
+        if frame % 200 == 0:
+            print(f"frame {frame:>5}: latency {latency:6.1f} ms  {controller.stats()}")
+
+    print()
+    all_ok = True
+    for _, load in schedule:
+        costs = phase_costs[load]
+        settled = np.mean(costs[-20:]) if costs else 0.0
+        ok = settled <= controller.budget_ms
+        all_ok &= ok
+        print(f"load x{load:<4} settled cost/frame {settled:6.1f} ms  budget {controller.budget_ms:.1f} ms  {'OK' if ok else 'OVER'}")
+    print(f"final knobs: {controller.stats()}")
+    sys.exit(0 if all_ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,515 @@
+# camera_pipeline.py
+
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+from extensions import db
+from models import CameraFence, IntrusionZone
+from metrics import METRICS
+from output_stage import FrameEncoder
+
+
+class FrameGrabber:
+    """
+    Reads a capture device on its own thread into a single-slot buffer.
+
+    The detection loop always gets the freshest frame; any frame that is
+    overwritten before it was consumed is counted as dropped, so slow
+    inference never lets the OpenCV/RTSP buffers build up latency.
+    """
+
+    def __init__(self, cap, cam_id, realtime_pacing=False):
+        self.cap = cap
+        self.cam_id = cam_id
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self.eof = False
+
+        # Recorded files would otherwise be read as fast as the disk allows
+        fps = cap.get(cv2.CAP_PROP_FPS) if realtime_pacing else 0
+        self._frame_interval = 1.0 / fps if fps and fps > 0 else 0.0
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._captured_at = None
+        self._fresh = False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"grabber-{cam_id}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        next_due = time.monotonic()
+        while self._running:
+            success, frame = self.cap.read()
+            captured_at = time.monotonic()
+            if not success:
+                break
+            with self._cond:
+                if self._fresh:
+                    self.frames_dropped += 1
+                self._frame = frame
+                self._captured_at = captured_at
+                self._fresh = True
+                self.frames_read += 1
+                self._cond.notify_all()
+            if self._frame_interval:
+                next_due += self._frame_interval
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        with self._cond:
+            self.eof = True
+            self._cond.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        Returns (frame, captured_at) for the newest unread frame.
+        Returns (None, None) on timeout or once the source has ended.
+        """
+        with self._cond:
+            if not self._fresh and not self.eof:
+                self._cond.wait(timeout)
+            if not self._fresh:
+                return None, None
+            self._fresh = False
+            return self._frame, self._captured_at
+
+    def stop(self):
+        self._running = False
+        self._thread.join(timeout=2.0)
+
+
+class StreamViewer:
+    """One MJPEG client: its output scale, frame-rate cap and delivery counters."""
+
+    def __init__(self, scale=1.0, max_fps=0.0):
+        self.scale = scale
+        self.max_fps = max_fps      # 0 = every frame the pipeline produces
+        self.sent = 0
+        self.skipped = 0            # Frames replaced before this client was ready for them
+
+    def stats(self):
+        return {'scale': self.scale, 'max_fps': self.max_fps, 'sent': self.sent, 'skipped': self.skipped}
+
+
+class CameraPipeline:
+    """
+    One long-lived capture + detection worker per camera.
+    The worker decodes and detects once per frame and publishes the latest
+    annotated JPEG, which any number of viewers can read.
+    """
+
+    def __init__(self, cam_id, detection_manager, fence_cache, idle_timeout=5.0, keep_alive=False):
+        self.cam_id = cam_id
+        self.detection_manager = detection_manager
+        self.fence_cache = fence_cache
+        self.idle_timeout = idle_timeout
+        self.keep_alive = keep_alive    # Monitored cameras never stop for lack of viewers
+        self.started_at = None
+        self.grabber = None
+        self.frames_processed = 0
+        self.frame_size = None      # (width, height) of the stream, known once the device is open
+        self._size_known = threading.Event()
+        self._latencies = deque(maxlen=300)    # Recent capture-to-output latencies (seconds)
+
+        config = detection_manager.app.config
+        self.jpeg_quality = config.get('STREAM_JPEG_QUALITY', 95)
+        self.default_scale = config.get('STREAM_SCALE', 1.0)
+        self.frames_unrendered = 0  # Frames processed with nobody watching (no overlay, no encode)
+        self._encoders = {}         # One encoder per output scale in use: {scale: FrameEncoder}
+        self._viewers = []          # Attached StreamViewers
+        self._listeners = []        # Callbacks run on every publish (e.g. the async stream server)
+
+        self._cond = threading.Condition()
+        self._chunks = {}           # Latest multipart JPEG chunk per scale (bytes), shared by its viewers
+        self._seq = 0               # Increments every time a new frame is published
+        self._subscribers = 0
+        self._idle_since = None
+        self._running = False
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._running
+
+    @property
+    def subscribers(self):
+        return self._subscribers
+
+    @property
+    def exited(self):
+        """True once the worker thread has finished, including its state cleanup."""
+        return self._thread is None or not self._thread.is_alive()
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+            self._idle_since = time.monotonic()
+            self.started_at = time.monotonic()
+            self._thread = threading.Thread(
+                target=self._run, name=f"pipeline-{self.cam_id}", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, join=True):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if join and self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5.0)
+
+    def attach(self, viewer):
+        """
+        Registers a StreamViewer. Capture keeps running across attach/detach.
+        Returns False if the worker has already shut down.
+        """
+        with self._cond:
+            if not self._running:
+                return False
+            if viewer.scale is None:
+                viewer.scale = self.default_scale
+            if viewer.scale not in self._encoders:
+                self._encoders[viewer.scale] = FrameEncoder(self.jpeg_quality, viewer.scale)
+            self._viewers.append(viewer)
+            self._subscribers += 1
+            self._idle_since = None
+            return True
+
+    def detach(self, viewer):
+        with self._cond:
+            if viewer in self._viewers:
+                self._viewers.remove(viewer)
+            self._subscribers = max(0, self._subscribers - 1)
+            if self._subscribers == 0:
+                self._idle_since = time.monotonic()
+
+    def set_keep_alive(self, keep_alive):
+        with self._cond:
+            if self.keep_alive and not keep_alive and self._subscribers == 0:
+                # Start the idle countdown from the moment monitoring ends
+                self._idle_since = time.monotonic()
+            self.keep_alive = keep_alive
+
+    def wait_for_frame(self, last_seq, timeout=1.0, scale=None):
+        """
+        Blocks until a frame newer than `last_seq` is published.
+        Returns (seq, chunk), where chunk is the frame's complete multipart
+        part (boundary, header and JPEG) at the given output scale; chunk is
+        None on timeout or shutdown. Only the newest frame is ever kept, so a
+        client that falls behind skips straight to it.
+        """
+        scale = self.default_scale if scale is None else scale
+        with self._cond:
+            if self._seq == last_seq and self._running:
+                self._cond.wait(timeout)
+            if self._seq == last_seq:
+                return last_seq, None
+            return self._seq, self._chunks.get(scale)
+
+    def wait_for_size(self, timeout=3.0):
+        """The stream's (width, height), or None if the device did not open in time."""
+        self._size_known.wait(timeout)
+        return self.frame_size
+
+    def _idle_expired(self):
+        """Checks for an idle timeout and marks the worker stopped atomically."""
+        with self._cond:
+            if self.keep_alive:
+                return False
+            if (self._subscribers == 0 and self._idle_since is not None
+                    and time.monotonic() - self._idle_since > self.idle_timeout):
+                self._running = False
+                self._cond.notify_all()
+                return True
+            return False
+
+    def stats(self):
+        """Live counters and capture-to-display latency for this camera."""
+        latencies = np.array(self._latencies) * 1000.0 if self._latencies else None
+        grabber = self.grabber
+        slo_ms = self.detection_manager.app.config.get('LATENCY_SLO_MS', 500.0)
+        return {
+            'cam_id': self.cam_id,
+            'running': self._running,
+            'subscribers': self._subscribers,
+            'frames_read': grabber.frames_read if grabber else 0,
+            'frames_dropped': grabber.frames_dropped if grabber else 0,
+            'frames_processed': self.frames_processed,
+            'latency_ms_last': round(float(latencies[-1]), 1) if latencies is not None else None,
+            'latency_ms_p50': round(float(np.percentile(latencies, 50)), 1) if latencies is not None else None,
+            'latency_ms_p95': round(float(np.percentile(latencies, 95)), 1) if latencies is not None else None,
+            'latency_slo_ms': slo_ms,
+            'track_store': self.detection_manager.track_stats(self.cam_id),
+            'motion_gate': self.detection_manager.motion_stats(self.cam_id),
+            'quality': self.detection_manager.quality_stats(self.cam_id),
+            'output': {
+                'encoders': {str(scale): encoder.stats() for scale, encoder in list(self._encoders.items())},
+                'frames_unrendered': self.frames_unrendered,
+                'render_buffer_allocations': self.detection_manager.render_allocations.get(self.cam_id, 0),
+            },
+            'viewers': [viewer.stats() for viewer in list(self._viewers)],
+            'slo_met': bool(np.percentile(latencies, 95) <= slo_ms) if latencies is not None else None,
+        }
+
+    def add_listener(self, callback):
+        """Calls `callback()` from the pipeline thread after every published frame."""
+        with self._cond:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._cond:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _publish(self, chunks):
+        with self._cond:
+            self._chunks = chunks
+            self._seq += 1
+            self._cond.notify_all()
+            listeners = list(self._listeners)
+        for callback in listeners:
+            callback()
+
+    def _run(self):
+        source = int(self.cam_id) if self.cam_id.isdigit() else self.cam_id
+        cap = cv2.VideoCapture(source)
+
+        if not cap.isOpened():
+            print(f"Failed to open camera: {source}")
+            self.stop(join=False)
+            self._size_known.set()
+            return
+
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if width and height:
+            self.frame_size = (width, height)
+            self._size_known.set()
+
+        # Keep the driver-side queue as short as the backend allows
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        is_file = isinstance(source, str) and '://' not in source
+        self.grabber = FrameGrabber(cap, self.cam_id, realtime_pacing=is_file)
+
+        print(f"[INFO] Pipeline started for camera {self.cam_id}")
+        try:
+            fence_version, fence_data = self.fence_cache.get(self.cam_id)
+
+            while self._running:
+                if self._idle_expired():
+                    print(f"[INFO] No viewers on camera {self.cam_id}, stopping pipeline")
+                    break
+
+                start = time.perf_counter()
+                frame, captured_at = self.grabber.read()
+                if frame is None:
+                    if self.grabber.eof:
+                        break
+                    continue
+                if not self._size_known.is_set():
+                    # Some backends report 0x0 until the first frame is decoded
+                    self.frame_size = (frame.shape[1], frame.shape[0])
+                    self._size_known.set()
+
+                # Pick up fences saved or reset while the stream is running
+                if self.fence_cache.version(self.cam_id) != fence_version:
+                    fence_version, fence_data = self.fence_cache.get(self.cam_id)
+
+                METRICS.observe(self.cam_id, 'capture_wait', time.perf_counter() - start)
+
+                # Headless monitoring keeps detecting but skips drawing and encoding for nobody
+                render = self._subscribers > 0
+                start = time.perf_counter()
+                processed_frame = self.detection_manager.detect_and_track(
+                    frame, fence_data, self.cam_id, render=render
+                )
+                METRICS.observe(self.cam_id, 'process', time.perf_counter() - start)
+                self.frames_processed += 1
+
+                if processed_frame is None:
+                    self.frames_unrendered += 1
+                    self._latencies.append(time.monotonic() - captured_at)
+                    continue
+
+                # Encode once per scale that has viewers, never once per viewer
+                with self._cond:
+                    scales = {viewer.scale for viewer in self._viewers}
+                start = time.perf_counter()
+                chunks = {}
+                for scale in scales:
+                    chunk = self._encoders[scale].encode(processed_frame)
+                    if chunk is not None:
+                        chunks[scale] = chunk
+                METRICS.observe(self.cam_id, 'encode', time.perf_counter() - start)
+                if chunks:
+                    self._publish(chunks)
+                    self._latencies.append(time.monotonic() - captured_at)
+        except Exception as e:
+            print(f"[ERROR] Pipeline for camera {self.cam_id} crashed: {e}")
+        finally:
+            self._size_known.set()
+            self.grabber.stop()
+            cap.release()
+            self.stop(join=False)
+            # Tracking state is reset only when the worker itself goes away,
+            # never when a single viewer disconnects.
+            self.detection_manager.cleanup_camera_state(self.cam_id)
+
+
+class PipelineManager:
+    """Process-wide registry of camera pipelines keyed by cam_id."""
+
+    def __init__(self, detection_manager, fence_cache, idle_timeout=5.0):
+        self.detection_manager = detection_manager
+        self.fence_cache = fence_cache
+        self.idle_timeout = idle_timeout
+        self._pipelines = {}
+        self._monitored = set()     # cam_ids kept running by the supervisor
+        self._failures = {}         # cam_id -> consecutive restart count
+        self._next_restart = {}     # cam_id -> earliest monotonic time to retry
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._supervisor = None
+
+    def get(self, cam_id):
+        return self._pipelines.get(str(cam_id))
+
+    def _new_pipeline(self, cam_id):
+        pipeline = CameraPipeline(
+            cam_id, self.detection_manager, self.fence_cache, self.idle_timeout,
+            keep_alive=cam_id in self._monitored
+        )
+        self._pipelines[cam_id] = pipeline
+        pipeline.start()
+        return pipeline
+
+    def acquire(self, cam_id, viewer, restart_timeout=15.0):
+        """
+        Returns a pipeline for the camera with one viewer attached. A stopped
+        pipeline is replaced only after its thread has exited: its final
+        cleanup_camera_state() would otherwise wipe the new pipeline's
+        tracker. If the old thread is still alive after `restart_timeout`
+        seconds, the stopped pipeline is returned without the viewer.
+        """
+        cam_id = str(cam_id)
+        deadline = time.monotonic() + restart_timeout
+        while True:
+            with self._lock:
+                pipeline = self._pipelines.get(cam_id)
+                if pipeline is not None and pipeline.attach(viewer):
+                    return pipeline
+                if pipeline is None or pipeline.exited:
+                    pipeline = self._new_pipeline(cam_id)
+                    pipeline.attach(viewer)
+                    return pipeline
+            # Wait for the old worker to release the device outside the lock,
+            # so other cameras' viewers are not held up meanwhile
+            pipeline.stop()
+            if not pipeline.exited and time.monotonic() > deadline:
+                print(f"[ERROR] Pipeline for camera {cam_id} did not shut down; not restarting it")
+                return pipeline
+
+    def release(self, pipeline, viewer):
+        pipeline.detach(viewer)
+
+    def frame_size(self, cam_id, timeout=3.0):
+        """
+        The camera's native (width, height), taken from its running pipeline
+        so the device is never opened twice. A stopped camera is started
+        first; it stays up for idle_timeout, long enough for the page's
+        stream request to attach to it. Returns None if it cannot be opened.
+        """
+        pipeline = self.get(cam_id)
+        if pipeline is None or not pipeline.running:
+            viewer = StreamViewer(scale=None)
+            pipeline = self.acquire(cam_id, viewer)
+            self.release(pipeline, viewer)
+        return pipeline.wait_for_size(timeout)
+
+    def stats(self):
+        """Stats for every known pipeline, keyed by cam_id."""
+        return {cam_id: pipeline.stats() for cam_id, pipeline in list(self._pipelines.items())}
+
+    # --- HEADLESS MONITORING ---
+
+    def sync_monitored(self, cam_ids):
+        """
+        Keeps a pipeline running for every cam_id in `cam_ids`, restarting
+        dead ones with exponential backoff, and releases cameras that are
+        no longer monitored back to viewer-driven lifetime.
+        """
+        cam_ids = {str(cam_id) for cam_id in cam_ids}
+        now = time.monotonic()
+        with self._lock:
+            for cam_id in self._monitored - cam_ids:
+                pipeline = self._pipelines.get(cam_id)
+                if pipeline is not None:
+                    pipeline.set_keep_alive(False)
+                self._failures.pop(cam_id, None)
+                self._next_restart.pop(cam_id, None)
+                print(f"[INFO] Camera {cam_id} is no longer monitored")
+            self._monitored = cam_ids
+
+            for cam_id in cam_ids:
+                pipeline = self._pipelines.get(cam_id)
+                if pipeline is not None and pipeline.running:
+                    pipeline.set_keep_alive(True)
+                    # A pipeline that stayed up for a while counts as healthy again
+                    if now - pipeline.started_at > 30.0:
+                        self._failures[cam_id] = 0
+                    continue
+
+                if now < self._next_restart.get(cam_id, 0.0):
+                    continue
+                if pipeline is not None and not pipeline.exited:
+                    # Its worker is still cleaning up; restart on a later pass
+                    pipeline.stop(join=False)
+                    continue
+
+                if pipeline is not None:
+                    failures = self._failures.get(cam_id, 0) + 1
+                    self._failures[cam_id] = failures
+                    self._next_restart[cam_id] = now + min(2 ** failures, 60)
+                    print(f"[WARN] Restarting pipeline for camera {cam_id} (attempt {failures})")
+                else:
+                    print(f"[INFO] Monitoring camera {cam_id}")
+                self._new_pipeline(cam_id)
+
+    def _fenced_camera_ids(self):
+        with self.detection_manager.app.app_context():
+            cam_ids = {row.cam_id for row in db.session.query(CameraFence.cam_id).distinct()}
+            cam_ids |= {row.cam_id for row in db.session.query(IntrusionZone.cam_id).distinct()}
+            return cam_ids
+
+    def _supervise(self, interval):
+        while not self._stop_event.is_set():
+            try:
+                self.sync_monitored(self._fenced_camera_ids())
+            except Exception as e:
+                print(f"[ERROR] Pipeline supervisor failed: {e}")
+            self._stop_event.wait(interval)
+
+    def start_supervisor(self, interval=5.0):
+        """Starts detection for every fenced or zoned camera, independent of viewers."""
+        if self._supervisor is not None and self._supervisor.is_alive():
+            return
+        self._stop_event.clear()
+        self._supervisor = threading.Thread(
+            target=self._supervise, args=(interval,), name="pipeline-supervisor", daemon=True
+        )
+        self._supervisor.start()
+        print("[INFO] Pipeline supervisor started")
+
+    def stop_all(self):
+        self._stop_event.set()
+        if self._supervisor is not None:
+            self._supervisor.join(timeout=5.0)
+        with self._lock:
+            pipelines = list(self._pipelines.values())
+            self._pipelines.clear()
+            self._monitored = set()
+        for pipeline in pipelines:
+            pipeline.stop()
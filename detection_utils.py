@@ -1,20 +1,92 @@
 # detection_utils.py
 
+import atexit
 import cv2
-from ultralytics import YOLO
-import os
-from datetime import datetime
-from models import FenceCrossEvent
-from extensions import db
-from shapely.geometry import LineString, Point
+import numpy as np
+import threading
+import time
+from event_writer import EventWriter
+from fence_geometry import FenceCrossingEngine
+from zones import ZoneMonitor
+from motion_gate import MotionGate
+from roi import fence_roi, split_tiles, nms
+from inference_backends import create_backend
+from metrics import METRICS
+from quality_controller import QualityController
+from thumbnails import Thumbnailer
+from tracker import ByteTracker
+from track_store import TrackStore
 
 class DetectionManager:
     def __init__(self, app):
         self.app = app
-        self.model = YOLO("yolov8n.pt")
+        config = app.config
+        self.imgsz = config.get('INFERENCE_IMGSZ', 640)    # Model input size for a full frame
+        self.backend = None
+        self.worker_pool = None
+        if config.get('DETECTION_WORKERS', 0) > 0:
+            # The model lives only in the worker processes (see detection_workers.py)
+            from detection_workers import DetectionWorkerPool
+            self.worker_pool = DetectionWorkerPool(
+                config['DETECTION_WORKERS'],
+                backend_name=config.get('INFERENCE_BACKEND', 'torch'),
+                weights=config.get('INFERENCE_WEIGHTS'),
+                imgsz=self.imgsz,
+                threads=config.get('DETECTION_WORKER_THREADS', 0),
+                warmup_runs=config.get('INFERENCE_WARMUP_RUNS', 2),
+            )
+            atexit.register(self.worker_pool.stop)
+        else:
+            self.backend = create_backend(
+                config.get('INFERENCE_BACKEND', 'torch'),
+                config.get('INFERENCE_WEIGHTS'),
+                imgsz=self.imgsz,
+                threads=config.get('INFERENCE_THREADS', 0),
+            )
+            # Pay the cold-start cost now rather than on the first viewer's frame
+            self.backend.warmup(config.get('INFERENCE_WARMUP_RUNS', 2))
+        self._model_lock = threading.Lock()     # The backend is shared by every camera thread
         # KEY CHANGE: Manage state per camera to avoid conflicts
-        self.object_paths = {}      # Stores path history: {cam_id: {track_id: [points]}}
-        self.alerted_objects = {}   # Stores alerted IDs: {cam_id: {track_ids}}
+        self.track_stores = {}      # Bounded path history and alert state: {cam_id: TrackStore}
+        self.trackers = {}          # One isolated tracker per camera: {cam_id: ByteTracker}
+        self._tracker_snapshots = {}    # Saved on stream stop: {cam_id: (time, tracker_state, track_store)}
+        self.tracker_restore_window = app.config.get('TRACKER_RESTORE_WINDOW', 10.0)
+        self._crossing_engines = {}     # {cam_id: (fence_data, FenceCrossingEngine)}
+        self.zone_monitors = {}         # {cam_id: ZoneMonitor}
+        self.motion_gates = {}          # {cam_id: MotionGate}, only when MOTION_GATING is on
+        self.inference_ms = {}          # Smoothed model time per camera: {cam_id: ms}
+        self._roi_tiles = {}            # {cam_id: (fence_data, frame size, tiles)} for ROI_INFERENCE
+        self.quality_controllers = {}   # {cam_id: QualityController}, only when QUALITY_CONTROL is on
+        self._display_buffers = {}      # Reused overlay buffer per camera: {cam_id: ndarray}
+        self.render_allocations = {}    # Times each camera's overlay buffer was (re)allocated
+
+        # Gallery thumbnails, written with each snapshot and served by /thumbs
+        self.thumbnailer = Thumbnailer(
+            app.static_folder,
+            width=config.get('THUMBNAIL_WIDTH', 320),
+            fmt=config.get('THUMBNAIL_FORMAT', 'webp'),
+            quality=config.get('THUMBNAIL_QUALITY', 70),
+        )
+        # Snapshots and event rows are written off the frame loop (see event_writer.py)
+        self.event_writer = EventWriter(
+            app,
+            max_queue=config.get('EVENT_QUEUE_SIZE', 64),
+            batch_size=config.get('EVENT_BATCH_SIZE', 32),
+            overflow=config.get('EVENT_OVERFLOW', 'block'),
+            block_timeout=config.get('EVENT_BLOCK_MS', 50) / 1000.0,
+            thumbnailer=self.thumbnailer,
+        )
+        atexit.register(self.event_writer.stop)
+
+        # Optional batched inference across cameras (see batch_inference.py)
+        self.batch_stage = None
+        if app.config.get('INFERENCE_BATCHING') and self.worker_pool is None:
+            from batch_inference import BatchInferenceStage
+            self.batch_stage = BatchInferenceStage(
+                self.backend,
+                max_batch=app.config.get('INFERENCE_MAX_BATCH', 8),
+                max_wait=app.config.get('INFERENCE_MAX_WAIT_MS', 10) / 1000.0,
+            )
 
     # In detection_utils.py
 
@@ -22,99 +94,319 @@ class DetectionManager:
         """
         Resets the tracking data for a camera instead of deleting the key.
         This prevents race conditions when a stream is reloaded.
+        The tracker state is snapshotted so a quick reconnect can resume it.
         """
-        # <<< KEY CHANGE: Instead of del, we reset to an empty dict/set >>>
-        if cam_id in self.object_paths:
-            self.object_paths[cam_id] = {}
-        if cam_id in self.alerted_objects:
-            self.alerted_objects[cam_id] = set()
+        tracker = self.trackers.pop(cam_id, None)
+        store = self.track_stores.get(cam_id)
+        if tracker is not None and store is not None:
+            self._tracker_snapshots[cam_id] = (time.monotonic(), tracker.snapshot(), store)
+        # <<< KEY CHANGE: Instead of del, we reset to a fresh store >>>
+        if cam_id in self.track_stores:
+            self.track_stores[cam_id] = self._new_track_store()
+        self.zone_monitors.pop(cam_id, None)
+        self.motion_gates.pop(cam_id, None)
+        self._roi_tiles.pop(cam_id, None)
+        self._display_buffers.pop(cam_id, None)
+        if self.worker_pool is not None:
+            self.worker_pool.release_camera(cam_id)
         print(f"[INFO] Reset tracking state for camera {cam_id}")
 
-    def detect_and_track(self, frame, fence_data, cam_id):
+    def _get_tracker(self, cam_id):
+        """Returns the camera's tracker, restoring a recent snapshot if there is one."""
+        tracker = self.trackers.get(cam_id)
+        if tracker is not None:
+            return tracker
+
+        tracker = self.trackers[cam_id] = ByteTracker()
+        saved = self._tracker_snapshots.pop(cam_id, None)
+        if saved and time.monotonic() - saved[0] <= self.tracker_restore_window:
+            _, state, store = saved
+            tracker.restore(state)
+            self.track_stores[cam_id] = store
+            print(f"[INFO] Restored {len(tracker)} tracks for camera {cam_id}")
+        return tracker
+
+    def _new_track_store(self):
+        config = self.app.config
+        return TrackStore(
+            history=config.get('TRACK_HISTORY_LEN', 32),
+            ttl_frames=config.get('TRACK_TTL_FRAMES', 90),
+            alert_cooldown=config.get('ALERT_COOLDOWN_FRAMES', 900),
+        )
+
+    def track_stats(self, cam_id):
+        """Live track count and memory held by the camera's track store."""
+        store = self.track_stores.get(cam_id)
+        return store.stats() if store is not None else None
+
+    def _get_crossing_engine(self, fence_data, cam_id):
+        """Builds the segment array once per fence instead of once per frame."""
+        cached = self._crossing_engines.get(cam_id)
+        if cached is None or cached[0] is not fence_data:
+            cached = self._crossing_engines[cam_id] = (fence_data, FenceCrossingEngine.from_fence_data(fence_data))
+        return cached[1]
+
+    def _get_zone_monitor(self, fence_data, frame, cam_id):
+        """The camera's zone monitor; its mask is rebuilt only when zones are edited."""
+        monitor = self.zone_monitors.get(cam_id)
+        if monitor is None:
+            monitor = self.zone_monitors[cam_id] = ZoneMonitor(
+                dwell_seconds=self.app.config.get('ZONE_DWELL_SECONDS', 10.0),
+                confirm_frames=self.app.config.get('ZONE_CONFIRM_FRAMES', 3),
+                lost_frames=self.app.config.get('ZONE_LOST_FRAMES', 30),
+                ttl_frames=self.app.config.get('TRACK_TTL_FRAMES', 90),
+            )
+        zones = fence_data.get('zones') if fence_data else None
+        monitor.set_zones(zones, frame.shape[1], frame.shape[0])
+        return monitor
+
+    def _get_motion_gate(self, fence_data, frame, cam_id):
+        if not self.app.config.get('MOTION_GATING', False):
+            return None
+        gate = self.motion_gates.get(cam_id)
+        if gate is None:
+            gate = self.motion_gates[cam_id] = MotionGate(
+                threshold=self.app.config.get('MOTION_THRESHOLD', 0.002),
+                pixel_delta=self.app.config.get('MOTION_PIXEL_DELTA', 8),
+                max_skip_frames=self.app.config.get('MOTION_MAX_SKIP_FRAMES', 30),
+            )
+        gate.set_region(fence_data, frame.shape[1], frame.shape[0])
+        return gate
+
+    def _get_quality_controller(self, cam_id):
+        config = self.app.config
+        if not config.get('QUALITY_CONTROL'):
+            return None
+        controller = self.quality_controllers.get(cam_id)
+        if controller is None:
+            controller = self.quality_controllers[cam_id] = QualityController(
+                target_fps=config.get('QUALITY_TARGET_FPS', 10.0),
+                imgsz_min=config.get('QUALITY_IMGSZ_MIN', 320),
+                imgsz_max=self.imgsz,
+                max_stride=config.get('QUALITY_MAX_STRIDE', 4),
+                conf_min=config.get('QUALITY_CONF_MIN', 0.25),
+                conf_max=config.get('QUALITY_CONF_MAX', 0.5),
+            )
+        return controller
+
+    def event_stats(self):
+        """Queue depth and write/drop counters of the background event writer."""
+        return self.event_writer.stats()
+
+    def worker_stats(self):
+        """Per-process detection stats, or None when the model runs in-process."""
+        return self.worker_pool.stats() if self.worker_pool is not None else None
+
+    def quality_stats(self, cam_id):
+        """Current input size, stride and confidence chosen for the camera."""
+        controller = self.quality_controllers.get(cam_id)
+        return controller.stats() if controller is not None else None
+
+    def motion_stats(self, cam_id):
+        """Skip ratio and estimated CPU saved by the camera's motion gate."""
+        gate = self.motion_gates.get(cam_id)
+        return gate.stats(self.inference_ms.get(cam_id)) if gate is not None else None
+
+    def _draw_tracks(self, display_frame, boxes, track_ids, scores):
+        for box, track_id, score in zip(boxes.astype(int), track_ids, scores):
+            cv2.rectangle(display_frame, (box[0], box[1]), (box[2], box[3]), (0, 255, 0), 2)
+            cv2.putText(display_frame, f"ID:{track_id} {score:.2f}", (box[0], max(box[1] - 6, 12)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+    def _draw_roi(self, display_frame, cam_id):
+        cached = self._roi_tiles.get(cam_id)
+        if cached is None:
+            return
+        for x1, y1, x2, y2 in cached[2]:
+            if (x1, y1, x2, y2) != (0, 0, display_frame.shape[1], display_frame.shape[0]):
+                cv2.rectangle(display_frame, (x1, y1), (x2 - 1, y2 - 1), (160, 160, 160), 1)
+
+    def _display_buffer(self, frame, cam_id):
+        """Copies the frame into the camera's preallocated overlay buffer."""
+        buffer = self._display_buffers.get(cam_id)
+        if buffer is None or buffer.shape != frame.shape:
+            buffer = self._display_buffers[cam_id] = np.empty_like(frame)
+            self.render_allocations[cam_id] = self.render_allocations.get(cam_id, 0) + 1
+        np.copyto(buffer, frame)
+        return buffer
+
+    def _render_static(self, frame, fence_data, cam_id):
+        """Overlay for a frame the motion gate skipped: last known tracks plus fences."""
+        display_frame = self._display_buffer(frame, cam_id)
+        tracker = self.trackers.get(cam_id)
+        if tracker is not None:
+            active = tracker.age == 0
+            self._draw_tracks(display_frame, tracker.boxes[active], tracker.ids[active], tracker.scores[active])
+        self._get_crossing_engine(fence_data, cam_id).draw(display_frame)
+        zone_monitor = self.zone_monitors.get(cam_id)
+        if zone_monitor is not None and zone_monitor.zone_mask is not None:
+            zone_monitor.zone_mask.draw(display_frame)
+        return display_frame
+
+    def _inference_tiles(self, fence_data, frame, cam_id):
+        """
+        Rectangles the model runs on: the fence ROI (optionally tiled) when
+        ROI_INFERENCE is on, otherwise the whole frame.
+        """
+        height, width = frame.shape[:2]
+        full_frame = [(0, 0, width, height)]
+        if not self.app.config.get('ROI_INFERENCE'):
+            return full_frame
+
+        cached = self._roi_tiles.get(cam_id)
+        if cached is None or cached[0] is not fence_data or cached[1] != (width, height):
+            roi = fence_roi(fence_data, width, height, margin=self.app.config.get('ROI_MARGIN', 0.1))
+            # The batch stage takes one image per camera, so it gets the untiled ROI
+            tile_size = 0 if self.batch_stage is not None else self.app.config.get('ROI_TILE_SIZE', 0)
+            tiles = split_tiles(roi, tile_size) if roi else full_frame
+            cached = self._roi_tiles[cam_id] = (fence_data, (width, height), tiles)
+        return cached[2]
+
+    def _detect(self, frame, cam_id, fence_data=None, imgsz=None, conf=None):
         """
-        Processes a single frame using YOLO's robust tracker and checks for intrusion.
+        Runs the detector only (no tracking) and returns (boxes, scores) as
+        NumPy arrays in full-frame coordinates, or None if the frame was
+        dropped by the batch stage. `imgsz` and `conf` override the defaults
+        (the batch stage always uses the defaults).
+        """
+        height, width = frame.shape[:2]
+        imgsz = imgsz or self.imgsz
+        tiles = self._inference_tiles(fence_data, frame, cam_id)
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+
+        if self.batch_stage is not None:
+            detections = self.batch_stage.infer(cam_id, crops[0])
+            if detections is None:
+                return None
+            detections = [detections]
+        else:
+            kwargs = {'imgsz': imgsz, 'conf': conf}
+            if tiles[0] != (0, 0, width, height):
+                # Keep the full-frame pixel scale so the cost shrinks with the cropped area
+                longest = max(max(x2 - x1, y2 - y1) for x1, y1, x2, y2 in tiles)
+                kwargs['imgsz'] = max(32, int(np.ceil(longest * imgsz / max(width, height) / 32)) * 32)
+            if self.worker_pool is not None:
+                # The worker crops the tiles out of the shared frame itself
+                detections = self.worker_pool.infer(cam_id, frame, tiles, **kwargs)
+                if detections is None:
+                    return None
+            else:
+                with self._model_lock:
+                    detections = self.backend.detect(crops, **kwargs)
+
+        boxes = [b + np.array([x1, y1, x1, y1], dtype=np.float32)
+                 for (b, _), (x1, y1, _, _) in zip(detections, tiles)]
+        scores = [s for _, s in detections]
+        boxes = np.concatenate(boxes) if boxes else np.zeros((0, 4), dtype=np.float32)
+        scores = np.concatenate(scores) if scores else np.zeros(0, dtype=np.float32)
+        if len(tiles) > 1:
+            # Objects on a tile seam are detected twice
+            keep = nms(boxes, scores)
+            boxes, scores = boxes[keep], scores[keep]
+        return boxes, scores
+
+    def detect_and_track(self, frame, fence_data, cam_id, render=True):
         """
-        # Ensure state dictionaries exist for the current camera
-        if cam_id not in self.object_paths:
-            self.object_paths[cam_id] = {}
-            self.alerted_objects[cam_id] = set()
-
-        # KEY CHANGE: Use model.track() for superior object tracking
-        results = self.model.track(frame, persist=True, verbose=False, classes=[0]) # class 0 is 'person'
-        
-        display_frame = results[0].plot()  # YOLO's built-in drawing for boxes and IDs
-
-        fence_line = None
-        if fence_data:
-            x1, y1 = int(fence_data['line_x1']), int(fence_data['line_y1'])
-            x2, y2 = int(fence_data['line_x2']), int(fence_data['line_y2'])
-            cv2.line(display_frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
-            fence_line = LineString([(x1, y1), (x2, y2)])
-
-        # Check for crossings only if a fence and tracked objects exist
-        if fence_line and results[0].boxes.id is not None:
-            boxes = results[0].boxes.xyxy.cpu()
-            track_ids = results[0].boxes.id.int().cpu().tolist()
-
-            for box, track_id in zip(boxes, track_ids):
-                # Calculate the center of the bounding box
-                center = (int((box[0] + box[2]) / 2), int((box[1] + box[3]) / 2))
-
-                # Update the object's path history
-                if track_id not in self.object_paths[cam_id]:
-                    self.object_paths[cam_id][track_id] = []
-                self.object_paths[cam_id][track_id].append(center)
-                
-                # We need at least two points to define a movement path for the check
-                path = self.object_paths[cam_id][track_id]
-                if len(path) >= 2:
-                    movement_line = LineString([path[-2], path[-1]])
-                    
-                    # KEY CHANGE: Use robust intersection check and prevent re-alerting
-                    if movement_line.intersects(fence_line) and track_id not in self.alerted_objects[cam_id]:
-                        self.alerted_objects[cam_id].add(track_id)
-                        self._save_snapshot_and_log(frame, center, cam_id, track_id)
-        
+        Processes a single frame: detection, per-camera tracking and the intrusion check.
+        Returns the annotated frame, or None when `render` is off (nobody is watching).
+        The annotated frame is a reused per-camera buffer, valid until the next call.
+        """
+        # Skip the model only on static, empty scenes; while any track is live
+        # every frame runs so tracks stay continuous for the crossing check
+        gate = self._get_motion_gate(fence_data, frame, cam_id)
+        if gate is not None:
+            tracker = self.trackers.get(cam_id)
+            with METRICS.timed(cam_id, 'motion_gate'):
+                infer = gate.should_infer(frame, tracking=tracker is not None and len(tracker) > 0)
+        if gate is not None and not infer:
+            return self._render_static(frame, fence_data, cam_id) if render else None
+
+        # Detection stride chosen by the adaptive quality controller
+        quality = self._get_quality_controller(cam_id)
+        if quality is not None and not quality.should_process():
+            return self._render_static(frame, fence_data, cam_id) if render else None
+
+        start = time.perf_counter()
+        if quality is not None:
+            detections = self._detect(frame, cam_id, fence_data, imgsz=quality.imgsz, conf=quality.conf)
+        else:
+            detections = self._detect(frame, cam_id, fence_data)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        METRICS.observe(cam_id, 'inference', elapsed_ms / 1000.0)
+        self.inference_ms[cam_id] = 0.9 * self.inference_ms.get(cam_id, elapsed_ms) + 0.1 * elapsed_ms
+        if quality is not None:
+            quality.record(elapsed_ms)
+        if detections is None:
+            return self._display_buffer(frame, cam_id) if render else None
+        start = time.perf_counter()
+        tracker = self._get_tracker(cam_id)
+        boxes, track_ids, scores = tracker.update(*detections)
+
+        # Ensure the track store exists for the current camera (after a possible restore)
+        store = self.track_stores.get(cam_id)
+        if store is None:
+            store = self.track_stores[cam_id] = self._new_track_store()
+        store.begin_frame()
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+        previous, has_previous = store.append(track_ids, centers)
+        METRICS.observe(cam_id, 'tracking', time.perf_counter() - start)
+
+        engine = self._get_crossing_engine(fence_data, cam_id)
+        display_frame = None
+        if render:
+            start = time.perf_counter()
+            display_frame = self._display_buffer(frame, cam_id)
+            self._draw_tracks(display_frame, boxes, track_ids, scores)
+            engine.draw(display_frame)
+            self._draw_roi(display_frame, cam_id)
+            METRICS.observe(cam_id, 'render', time.perf_counter() - start)
+
+        # Check for crossings only if a fence and tracked objects exist.
+        # We need at least two points to define a movement path for the check.
+        start = time.perf_counter()
+        if len(engine) and len(track_ids):
+            moving = np.flatnonzero(has_previous)
+            crossed, _, entering = engine.crossings(previous[moving], centers[moving])
+            for i, is_entry in zip(moving[crossed], entering):
+                track_id = int(track_ids[i])
+                # KEY CHANGE: re-alert the same track only after the cooldown
+                if store.can_alert(track_id):
+                    store.mark_alerted(track_id)
+                    center = (int(centers[i][0]), int(centers[i][1]))
+                    direction = 'entry' if is_entry else 'exit'
+                    self._save_snapshot_and_log(frame, center, cam_id, track_id, direction,
+                                                box=boxes[i], score=scores[i])
+        METRICS.observe(cam_id, 'crossing', time.perf_counter() - start)
+
+        # Polygon zones: one mask lookup per tracked foot point (bottom centre of the box)
+        start = time.perf_counter()
+        zone_monitor = self._get_zone_monitor(fence_data, frame, cam_id)
+        if zone_monitor.zone_mask.zones:
+            if render:
+                zone_monitor.zone_mask.draw(display_frame)
+            foot_points = np.stack([centers[:, 0], boxes[:, 3]], axis=1) if len(boxes) else centers
+            rows = None
+            for track_id, zone, event_type, point in zone_monitor.update(track_ids, foot_points):
+                point = (int(point[0]), int(point[1]))
+                if rows is None:
+                    rows = {int(t): i for i, t in enumerate(track_ids)}
+                # A track that vanished inside a zone (see ZoneMonitor) has no box this frame
+                i = rows.get(int(track_id))
+                self._save_snapshot_and_log(frame, point, cam_id, track_id,
+                                            event_type=event_type, zone=zone,
+                                            box=boxes[i] if i is not None else None,
+                                            score=scores[i] if i is not None else None)
+        METRICS.observe(cam_id, 'zones', time.perf_counter() - start)
+
         return display_frame
 
-    def _save_snapshot_and_log(self, frame, center, cam_id, track_id):
-        """Saves a snapshot and logs the event to the database."""
-        print(f"[ALERT] Intrusion detected by Object ID {track_id} on Camera {cam_id}!")
-
-        # Use local time for filename but UTC for database
-        local_time = datetime.now()
-        utc_time = datetime.utcnow()
-        
-        # Format filename using local time
-        timestamp = local_time.strftime("%Y%m%d_%H%M%S")
-        img_name = f"intrusion_{cam_id}_{timestamp}_ID{track_id}.jpg"
-        
-        # Always forward slash for DB storage / URL
-        img_rel_path = f"intrusion_snaps/{img_name}"
-        
-        # Full path for saving image to static folder (os.join works for Windows/Linux)
-        img_full_path = os.path.join('static', 'intrusion_snaps', img_name)
-        
-        # Draw on snapshot
-        snapshot = frame.copy()
-        cv2.circle(snapshot, center, 10, (0, 0, 255), -1)
-        cv2.putText(snapshot, f"INTRUSION ID:{track_id}", (20, 40), 
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
-        
-        # Save image
-        cv2.imwrite(img_full_path, snapshot)
-        print(f"[INFO] Intrusion snapshot saved: {img_full_path}")
-
-        # Save to DB using UTC time
-        try:
-            with self.app.app_context():
-                event = FenceCrossEvent(
-                    cam_id=str(cam_id), 
-                    image_path=img_rel_path,
-                    timestamp=utc_time  # Explicitly set UTC timestamp
-                )
-                db.session.add(event)
-                db.session.commit()
-                print(f"[INFO] Intrusion event logged for cam {cam_id}")
-        except Exception as e:
-            print(f"[ERROR] Failed to log intrusion to database: {e}")
+    def _save_snapshot_and_log(self, frame, center, cam_id, track_id, direction=None,
+                               event_type=None, zone=None, box=None, score=None):
+        """Queues a snapshot and database event for the background writer."""
+        if zone is not None:
+            print(f"[ALERT] Object ID {track_id} {event_type} '{zone.get('name') or zone['id']}' on Camera {cam_id}!")
+        else:
+            print(f"[ALERT] Intrusion detected by Object ID {track_id} on Camera {cam_id} ({direction})!")
+        METRICS.inc('alerts', cam_id)
+        self.event_writer.submit(frame, center, cam_id, track_id, direction, event_type, zone,
+                                 box=box, confidence=score)
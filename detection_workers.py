@@ -0,0 +1,342 @@
+# detection_workers.py
+
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+
+def _attach_untracked(name):
+    """
+    Maps an existing shared memory block without registering it with the
+    resource tracker. Only the creating process may unlink it: a worker's
+    registration would have the block unlinked under the owner when the
+    worker exits, and since spawned workers share the owner's tracker,
+    unregistering afterwards would drop the owner's own entry instead.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        pass
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedFrameRing:
+    """
+    A fixed number of frame slots in one shared memory block. The owner
+    copies each frame into the next slot; other processes map the same block
+    by name and read the slot as a NumPy view, so frames never go through a
+    pipe or pickle.
+    """
+
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            self.shm = _attach_untracked(name)
+        self.name = self.shm.name
+        self._next = 0
+
+    def view(self, slot, shape, dtype=np.uint8):
+        """Zero-copy array over one slot."""
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def write(self, frame):
+        """Copies a frame into the next slot and returns that slot's index."""
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes does not fit a {self.slot_bytes} byte slot")
+        slot = self._next
+        self._next = (self._next + 1) % self.slots
+        np.copyto(self.view(slot, frame.shape, frame.dtype), frame)
+        return slot
+
+    def close(self, unlink=False):
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _worker_main(index, backend_name, weights, imgsz, threads, warmup_runs, tasks, results):
+    """
+    Detection worker process: loads its own copy of the model and answers
+    (request_id, cam_id, ring name, slot, shape, tiles, imgsz, conf) tasks
+    with (request_id, detections, elapsed_ms, error) records. A
+    ('release', cam_id) task unmaps that camera's ring.
+    """
+    from inference_backends import create_backend
+    backend = create_backend(backend_name, weights, imgsz=imgsz, threads=threads)
+    backend.warmup(warmup_runs)
+    results.put(('ready', index))
+
+    rings = {}      # {cam_id: SharedFrameRing} attached by name
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        if task[0] == 'release':
+            ring = rings.pop(task[1], None)
+            if ring is not None:
+                ring.close()
+            continue
+        request_id, cam_id, ring_name, slot_bytes, slot, shape, tiles, size, conf = task
+        start = time.perf_counter()
+        try:
+            ring = rings.get(cam_id)
+            if ring is None or ring.name != ring_name:
+                if ring is not None:
+                    ring.close()
+                # Attached read-only; slot count only matters to the writer
+                ring = rings[cam_id] = SharedFrameRing(0, slot_bytes, name=ring_name)
+            frame = ring.view(slot, shape)
+            crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+            detections = backend.detect(crops, imgsz=size, conf=conf)
+            results.put((request_id, detections, (time.perf_counter() - start) * 1000.0, None))
+        except Exception as e:
+            results.put((request_id, None, 0.0, f"{type(e).__name__}: {e}"))
+    for ring in rings.values():
+        ring.close()
+
+
+class DetectionWorkerPool:
+    """
+    Runs the detector in separate processes so model inference no longer
+    competes with capture, tracking and JPEG encoding for the GIL.
+
+    Each camera is pinned to the least-loaded worker the first time it is
+    seen. Frames travel through a per-camera SharedFrameRing; only the task
+    header goes over the worker's queue and only boxes and scores come back.
+    Tracking, crossing checks and event logging stay in the main process.
+
+    The result collector also supervises the workers: when a process dies,
+    its pending requests fail at once, its cameras move to the remaining
+    ready workers and a replacement is spawned (at most once per
+    `restart_delay` seconds, so a worker that crashes on load cannot spin).
+    """
+
+    def __init__(self, workers, backend_name='torch', weights=None, imgsz=640, threads=0,
+                 warmup_runs=2, ring_slots=3, startup_timeout=300.0, restart_delay=5.0):
+        self.workers = max(1, int(workers))
+        # Without an explicit count, split the cores evenly so workers don't oversubscribe
+        self.threads = threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.ring_slots = ring_slots
+        self.restart_delay = restart_delay
+
+        self._context = mp.get_context('spawn')     # Fork is unsafe once torch/OpenCV threads exist
+        self._worker_args = (backend_name, weights, imgsz, self.threads, warmup_runs)
+        self._results = self._context.Queue()
+        self._tasks = [None] * self.workers
+        self._processes = [None] * self.workers
+        for i in range(self.workers):
+            self._spawn(i)
+
+        self._lock = threading.Lock()
+        self._assignments = {}      # {cam_id: worker index}
+        self._rings = {}            # {cam_id: SharedFrameRing}
+        self._pending = {}          # {request_id: [Event, detections, worker]}
+        self._request_ids = itertools.count()
+        self._frames = [0] * self.workers
+        self._busy_ms = [0.0] * self.workers
+        self._ready = [False] * self.workers
+        self._restarts = [0] * self.workers
+        self._next_restart = [0.0] * self.workers
+        self.failed_requests = 0    # Requests failed because their worker died
+        self._running = True
+
+        deadline = time.monotonic() + startup_timeout
+        while not all(self._ready):
+            try:
+                message = self._results.get(timeout=1.0)
+            except queue.Empty:
+                dead = [p.name for p in self._processes if not p.is_alive()]
+                if dead or time.monotonic() > deadline:
+                    self.stop()
+                    raise RuntimeError(f"Detection workers failed to start: {', '.join(dead) or 'timed out'}")
+                continue
+            if message[0] == 'ready':
+                self._ready[message[1]] = True
+        print(f"[INFO] {self.workers} detection workers ready ({self.threads} threads each)")
+
+        self._collector = threading.Thread(target=self._collect, name="detection-results", daemon=True)
+        self._collector.start()
+
+    def _spawn(self, index):
+        """Starts worker `index` with a fresh task queue; it reports ('ready', index) once loaded."""
+        self._tasks[index] = self._context.Queue()
+        process = self._processes[index] = self._context.Process(
+            target=_worker_main,
+            args=(index, *self._worker_args, self._tasks[index], self._results),
+            name=f"detection-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+
+    def _worker_for(self, cam_id):
+        """Worker serving the camera, or None while no worker is ready. Caller holds the lock."""
+        worker = self._assignments.get(cam_id)
+        if worker is not None and self._ready[worker]:
+            return worker
+        ready = [i for i in range(self.workers) if self._ready[i]]
+        if not ready:
+            return None
+        load = {i: 0 for i in ready}
+        for assigned in self._assignments.values():
+            if assigned in load:
+                load[assigned] += 1
+        worker = self._assignments[cam_id] = min(ready, key=lambda i: load[i])
+        print(f"[INFO] Camera {cam_id} assigned to detection worker {worker}")
+        return worker
+
+    def _ring_for(self, cam_id, frame):
+        ring = self._rings.get(cam_id)
+        if ring is None or ring.slot_bytes < frame.nbytes:
+            if ring is not None:
+                ring.close(unlink=True)
+            ring = self._rings[cam_id] = SharedFrameRing(self.ring_slots, frame.nbytes)
+        return ring
+
+    def infer(self, cam_id, frame, tiles, imgsz=None, conf=None, timeout=5.0):
+        """
+        Blocking helper used by camera pipelines. Returns one (boxes, scores)
+        pair per tile rectangle, in tile coordinates, or None on timeout, when
+        the worker died mid-request or while no worker is ready.
+        """
+        frame = np.ascontiguousarray(frame)
+        event = threading.Event()
+        with self._lock:
+            if not self._running:
+                return None
+            worker = self._worker_for(cam_id)
+            if worker is None:
+                return None
+            ring = self._ring_for(cam_id, frame)
+            slot = ring.write(frame)
+            request_id = next(self._request_ids)
+            self._pending[request_id] = entry = [event, None, worker]
+            tasks = self._tasks[worker]
+        tasks.put((request_id, cam_id, ring.name, ring.slot_bytes, slot, frame.shape,
+                   list(tiles), imgsz, conf))
+        if not event.wait(timeout):
+            with self._lock:
+                self._pending.pop(request_id, None)
+            self._check_workers()
+            return None
+        return entry[1]
+
+    def _check_workers(self):
+        """Fails the requests of dead workers, frees their cameras and respawns them."""
+        now = time.monotonic()
+        failed = []
+        with self._lock:
+            if not self._running:
+                return
+            for i, process in enumerate(self._processes):
+                if process.is_alive():
+                    continue
+                if self._ready[i] or self._next_restart[i] == 0.0:
+                    # First time this death is seen
+                    self._ready[i] = False
+                    self._next_restart[i] = now
+                    lost = [request_id for request_id, entry in self._pending.items() if entry[2] == i]
+                    failed += [self._pending.pop(request_id) for request_id in lost]
+                    moved = [cam_id for cam_id, worker in self._assignments.items() if worker == i]
+                    for cam_id in moved:
+                        del self._assignments[cam_id]
+                    print(f"[ERROR] Detection worker {i} exited with code {process.exitcode}; "
+                          f"failed {len(lost)} pending request(s), reassigning {len(moved)} camera(s)")
+                if now < self._next_restart[i]:
+                    continue
+                self._next_restart[i] = now + self.restart_delay
+                self._restarts[i] += 1
+                self._spawn(i)
+                print(f"[WARN] Restarting detection worker {i} (restart #{self._restarts[i]})")
+            self.failed_requests += len(failed)
+        for entry in failed:
+            entry[0].set()
+
+    def _collect(self):
+        next_check = 0.0
+        while self._running:
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + 0.5
+            try:
+                message = self._results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if message[0] == 'ready':
+                with self._lock:
+                    self._ready[message[1]] = True
+                    self._next_restart[message[1]] = 0.0
+                print(f"[INFO] Detection worker {message[1]} ready again")
+                continue
+            request_id, detections, elapsed_ms, error = message
+            with self._lock:
+                entry = self._pending.pop(request_id, None)
+                if entry is not None:
+                    self._frames[entry[2]] += 1
+                    self._busy_ms[entry[2]] += elapsed_ms
+            if error:
+                print(f"[ERROR] Detection worker failed: {error}")
+            if entry is not None:
+                entry[1] = detections
+                entry[0].set()
+
+    def release_camera(self, cam_id):
+        """Frees a stopped camera's ring and worker slot, in this process and in its worker."""
+        with self._lock:
+            worker = self._assignments.pop(cam_id, None)
+            ring = self._rings.pop(cam_id, None)
+            tasks = self._tasks[worker] if worker is not None and self._ready[worker] else None
+        if tasks is not None:
+            tasks.put(('release', cam_id))
+        if ring is not None:
+            ring.close(unlink=True)
+
+    def stats(self):
+        with self._lock:
+            cameras = [0] * self.workers
+            for worker in self._assignments.values():
+                cameras[worker] += 1
+            return [
+                {
+                    'worker': i,
+                    'alive': process.is_alive(),
+                    'ready': self._ready[i],
+                    'restarts': self._restarts[i],
+                    'cameras': cameras[i],
+                    'frames': self._frames[i],
+                    'avg_ms': round(self._busy_ms[i] / self._frames[i], 1) if self._frames[i] else 0.0,
+                }
+                for i, process in enumerate(self._processes)
+            ]
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for entry in pending:
+            entry[0].set()
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+        for ring in self._rings.values():
+            ring.close(unlink=True)
+        self._rings.clear()
@@ -0,0 +1,236 @@
+# enhancement_jobs.py
+
+import hashlib
+import multiprocessing as mp
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from extensions import db
+from models import FenceCrossEvent
+
+ENHANCED_SUBDIR = 'enhanced'
+
+
+def _enhance_file(source_path, output_path, mode='quality', roi=None, roi_margin=0.25):
+    """Runs in a pool process: enhances one snapshot and writes the result atomically."""
+    from image_enhancement import enhance_image
+    enhanced = enhance_image(source_path, mode=mode, roi=roi, roi_margin=roi_margin)
+    if enhanced is None:
+        raise RuntimeError('Enhancement failed')
+    tmp_path = f"{output_path}.tmp.{os.getpid()}.jpg"
+    if not cv2.imwrite(tmp_path, enhanced):
+        raise RuntimeError('Could not write the enhanced image')
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+class QueueFull(Exception):
+    """Raised by EnhancementJobQueue.submit when max_pending jobs are already waiting."""
+
+
+class EnhancementJobQueue:
+    """
+    Runs snapshot enhancement in a bounded process pool instead of inside the
+    request. submit() returns a job right away and the page polls status().
+
+    Results are content-addressed: the output is named after the SHA-1 of the
+    source file and the preset, so a snapshot that was enhanced once is served
+    from disk (even across restarts), and concurrent requests for the same
+    image and preset are merged into the job already running.
+    """
+
+    def __init__(self, app, static_dir, workers=1, max_pending=16, job_ttl=600.0, roi_margin=0.25):
+        self.app = app
+        self.static_dir = static_dir
+        self.roi_margin = roi_margin    # Growth of the intruder box before ROI enhancement
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl          # Seconds a finished job stays pollable
+        self._lock = threading.Lock()
+        self._executor = None
+        self._jobs = {}                 # {job_id: job dict}
+        self._inflight = {}             # {(source hash, mode, roi): job_id} for queued/running jobs
+        self._hashes = {}               # {source path: ((mtime, size), hash)}
+
+        self.submitted = 0
+        self.cache_hits = 0
+        self.merged = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _pool(self):
+        if self._executor is None:
+            # Spawn, like the detection workers: forking a process that runs OpenCV threads is unsafe
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=mp.get_context('spawn'))
+        return self._executor
+
+    def _source_hash(self, path):
+        """SHA-1 of the file, memoized per path until its mtime or size changes."""
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = self._hashes.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        self._hashes[path] = (signature, digest.hexdigest())
+        return digest.hexdigest()
+
+    def _result_path(self, image_path, source_hash, mode, roi):
+        """Enhanced image path relative to the static folder, next to the snapshots."""
+        folder = os.path.dirname(image_path.replace('\\', '/'))
+        name = source_hash if mode == 'quality' else f"{source_hash}_{mode}"
+        # A snapshot's box never changes, so the source hash already pins it
+        if roi is not None:
+            name += '_roi'
+        name += '.jpg'
+        return '/'.join(part for part in (folder, ENHANCED_SUBDIR, name) if part)
+
+    def _full_path(self, relative_path):
+        return os.path.join(self.static_dir, *relative_path.split('/'))
+
+    def _new_job(self, snap_id, key, result_path, status):
+        job = {
+            'id': uuid.uuid4().hex,
+            'snap_ids': {snap_id},
+            'key': key,
+            'result_path': result_path,
+            'status': status,
+            'error': None,
+            'future': None,
+            'created': time.time(),
+            'finished': time.time() if status == 'done' else None,
+        }
+        self._jobs[job['id']] = job
+        return job
+
+    def _prune(self):
+        cutoff = time.time() - self.job_ttl
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job['finished'] is not None and job['finished'] < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, snap_id, image_path, mode='quality', roi=None):
+        """
+        Returns the job for enhancing `image_path` (relative to the static
+        folder) with the given preset ('quality' or 'fast'), focused on the
+        intruder box `roi` when one was recorded: an already
+        finished one on a cache hit, the in-flight one for the same image and
+        preset, or a newly queued one. Raises QueueFull when the pool is
+        saturated and FileNotFoundError if the snapshot is missing.
+        """
+        source_path = self._full_path(image_path.replace('\\', '/'))
+        with self._lock:
+            self._prune()
+            source_hash = self._source_hash(source_path)
+            roi = tuple(int(v) for v in roi) if roi is not None else None
+            result_path = self._result_path(image_path, source_hash, mode, roi)
+            key = (source_hash, mode, roi)
+
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                job = self._jobs[job_id]
+                job['snap_ids'].add(snap_id)
+                self.merged += 1
+                return self._public(job)
+
+            if os.path.exists(self._full_path(result_path)):
+                self.cache_hits += 1
+                job = self._new_job(snap_id, key, result_path, 'done')
+                self._record_result(job)
+                return self._public(job)
+
+            if len(self._inflight) >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f"{len(self._inflight)} enhancement jobs already pending")
+
+            os.makedirs(os.path.dirname(self._full_path(result_path)), exist_ok=True)
+            job = self._new_job(snap_id, key, result_path, 'queued')
+            self._inflight[key] = job['id']
+            self.submitted += 1
+            job['future'] = self._pool().submit(
+                _enhance_file, source_path, self._full_path(result_path), mode, roi, self.roi_margin
+            )
+        # Outside the lock: the callback runs inline if the future already finished
+        job['future'].add_done_callback(lambda future, job=job: self._finish(job, future))
+        return self._public(job)
+
+    def _finish(self, job, future):
+        error = future.exception() if not future.cancelled() else RuntimeError('Cancelled')
+        with self._lock:
+            self._inflight.pop(job['key'], None)
+            job['finished'] = time.time()
+            job['future'] = None
+            if error is None:
+                job['status'] = 'done'
+                self.completed += 1
+            else:
+                job['status'] = 'failed'
+                job['error'] = str(error)
+                self.failed += 1
+        if error is None:
+            self._record_result(job)
+        else:
+            print(f"[ERROR] Enhancement job {job['id']} failed: {error}")
+
+    def _record_result(self, job):
+        """Points every snapshot merged into the job at the enhanced image."""
+        try:
+            with self.app.app_context():
+                for snap_id in list(job['snap_ids']):
+                    snap = db.session.get(FenceCrossEvent, snap_id)
+                    if snap is not None:
+                        snap.enhanced_image_path = job['result_path']
+                db.session.commit()
+        except Exception as e:
+            print(f"[ERROR] Failed to record enhanced image for job {job['id']}: {e}")
+            with self.app.app_context():
+                db.session.rollback()
+
+    def _public(self, job):
+        status = job['status']
+        future = job['future']
+        if status == 'queued' and future is not None and future.running():
+            status = 'running'
+        return {
+            'job_id': job['id'],
+            'mode': job['key'][1],
+            'status': status,
+            'result_path': job['result_path'] if status == 'done' else None,
+            'error': job['error'],
+            'elapsed_s': round((job['finished'] or time.time()) - job['created'], 2),
+        }
+
+    def status(self, job_id):
+        """Job state ('queued', 'running', 'done' or 'failed'), or None for an unknown id."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job is not None else None
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._inflight)
+        return {
+            'workers': self.workers,
+            'pending': pending,
+            'max_pending': self.max_pending,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'cache_hits': self.cache_hits,
+            'merged': self.merged,
+            'rejected': self.rejected,
+        }
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
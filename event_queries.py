@@ -0,0 +1,138 @@
+# event_queries.py
+
+from datetime import datetime, time, timedelta
+
+import pytz
+from sqlalchemy import func, tuple_
+
+from extensions import db
+from models import FenceCrossEvent
+
+MAX_PAGE_SIZE = 200
+
+
+class EventPage:
+    """One page of events, newest first, plus the cursors to its neighbours."""
+
+    def __init__(self, events, older_cursor, newer_cursor, day_counts):
+        self.events = events
+        self.older_cursor = older_cursor    # id to pass as ?before= for the next (older) page
+        self.newer_cursor = newer_cursor    # id to pass as ?after= for the previous (newer) page
+        self.day_counts = day_counts        # {'YYYY-MM-DD': events that day under the same filters}
+
+    def grouped(self):
+        """Events on this page keyed by their local date, newest date first."""
+        groups = {}
+        for event in self.events:
+            groups.setdefault(event.display_date, []).append(event)
+        return groups
+
+
+def _local_day_start_utc(day, local_tz):
+    """Naive UTC datetime of local midnight on `day`; timestamps are stored as naive UTC."""
+    start = local_tz.localize(datetime.combine(day, time.min))
+    return start.astimezone(pytz.UTC).replace(tzinfo=None)
+
+
+def _local_date_expr(local_tz):
+    """
+    SQL expression for the local calendar date of an event. SQLite has no
+    time zone support, so the zone's current UTC offset is applied as a
+    fixed shift; exact for zones without DST such as the default Asia/Kolkata.
+    """
+    offset = local_tz.utcoffset(datetime.utcnow())
+    minutes = int(offset.total_seconds() // 60)
+    return func.date(FenceCrossEvent.timestamp, f'{minutes:+d} minutes')
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+def camera_ids():
+    """Distinct cameras that have events, for the filter dropdown (an index-only scan)."""
+    rows = db.session.query(FenceCrossEvent.cam_id).distinct().order_by(FenceCrossEvent.cam_id)
+    return [cam_id for (cam_id,) in rows]
+
+
+def query_events(local_tz, cam_id=None, date_from=None, date_to=None,
+                 before=None, after=None, limit=50, with_day_counts=False):
+    """
+    Keyset-paginated events ordered by (timestamp, id) descending. `before`
+    and `after` are event ids taken from a previous page, so each page is a
+    range scan on the (cam_id, timestamp, id) / (timestamp, id) indexes and
+    costs the same however deep into the history it is, unlike OFFSET.
+
+    date_from/date_to are inclusive local dates. Each event gets
+    display_time and display_date (the local day, computed in SQL).
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    key = tuple_(FenceCrossEvent.timestamp, FenceCrossEvent.id)
+    local_date = _local_date_expr(local_tz)
+
+    filters = []
+    if cam_id:
+        filters.append(FenceCrossEvent.cam_id == cam_id)
+    if date_from:
+        filters.append(FenceCrossEvent.timestamp >= _local_day_start_utc(date_from, local_tz))
+    if date_to:
+        filters.append(FenceCrossEvent.timestamp < _local_day_start_utc(date_to + timedelta(days=1), local_tz))
+
+    query = db.session.query(FenceCrossEvent, local_date).filter(*filters)
+
+    # Resolve the cursor id to its (timestamp, id) position; a stale id starts from the top
+    cursor_id = after if after is not None else before
+    cursor = None
+    if cursor_id is not None:
+        cursor_ts = db.session.query(FenceCrossEvent.timestamp).filter(FenceCrossEvent.id == cursor_id).scalar()
+        if cursor_ts is not None:
+            cursor = tuple_(cursor_ts, cursor_id)
+
+    newer = after is not None and cursor is not None
+    if newer:
+        # Walk forward from the cursor, then flip back to newest-first
+        query = query.filter(key > cursor).order_by(FenceCrossEvent.timestamp.asc(), FenceCrossEvent.id.asc())
+    else:
+        if cursor is not None:
+            query = query.filter(key < cursor)
+        query = query.order_by(FenceCrossEvent.timestamp.desc(), FenceCrossEvent.id.desc())
+
+    # One extra row tells whether another page exists in the walking direction
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if newer:
+        rows.reverse()
+
+    events = []
+    for event, day in rows:
+        event.display_time = event.timestamp.replace(tzinfo=pytz.UTC).astimezone(local_tz)
+        event.display_date = day
+        events.append(event)
+
+    if not events:
+        return EventPage(events, None, None, {})
+
+    if newer:
+        older_cursor, newer_cursor = events[-1].id, (events[0].id if has_more else None)
+    else:
+        older_cursor = events[-1].id if has_more else None
+        newer_cursor = events[0].id if cursor is not None else None
+
+    day_counts = {}
+    if with_day_counts:
+        # Full-day totals for the days this page touches, grouped in SQL
+        days = sorted({event.display_date for event in events})
+        counts = (
+            db.session.query(local_date, func.count(FenceCrossEvent.id))
+            .filter(*filters)
+            .filter(FenceCrossEvent.timestamp >= _local_day_start_utc(parse_date(days[0]), local_tz))
+            .filter(FenceCrossEvent.timestamp < _local_day_start_utc(parse_date(days[-1]) + timedelta(days=1), local_tz))
+            .group_by(local_date)
+        )
+        day_counts = dict(counts.all())
+
+    return EventPage(events, older_cursor, newer_cursor, day_counts)
@@ -0,0 +1,202 @@
+# event_writer.py
+
+import itertools
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+from extensions import db
+from metrics import METRICS
+from models import FenceCrossEvent
+
+
+class EventWriter:
+    """
+    Background writer for intrusion snapshots and FenceCrossEvent rows, so
+    disk and database latency never stalls a camera's frame loop.
+
+    Camera threads only enqueue the raw frame and the event fields. One
+    thread draws the marker, writes the JPEG and inserts the rows of
+    everything queued so far in a single transaction.
+
+    The queue is bounded. With overflow='block' a full queue makes the
+    producer wait up to `block_timeout` seconds (backpressure) before the
+    event is dropped; with overflow='shed' it is dropped immediately.
+    Dropped events are counted and reported in stats().
+    """
+
+    def __init__(self, app, max_queue=64, batch_size=32, overflow='block', block_timeout=0.05,
+                 snapshot_dir=os.path.join('static', 'intrusion_snaps'), thumbnailer=None):
+        self.app = app
+        self.batch_size = batch_size
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.snapshot_dir = snapshot_dir
+        self.thumbnailer = thumbnailer      # Gallery thumbnails, made from the frame already in memory
+        self._queue = queue.Queue(maxsize=max_queue)
+
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self._write_ms = 0.0
+        self._sequence = itertools.count(1)    # Only the writer thread draws from it
+
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame, center, cam_id, track_id, direction=None, event_type=None, zone=None,
+               box=None, confidence=None):
+        """
+        Queues one event. `frame` must not be modified afterwards (camera
+        threads get a fresh array per capture, so no copy is made here).
+        `box` (x1, y1, x2, y2) and `confidence` describe the detection that
+        raised it. Returns False if the event was dropped.
+        """
+        record = {
+            'frame': frame, 'center': center, 'cam_id': str(cam_id), 'track_id': track_id,
+            'direction': direction, 'event_type': event_type,
+            'zone_id': zone['id'] if zone is not None else None,
+            'box': [int(round(float(v))) for v in box] if box is not None else [None] * 4,
+            'confidence': round(float(confidence), 4) if confidence is not None else None,
+            # Use local time for filename but UTC for database
+            'local_time': datetime.now(),
+            'utc_time': datetime.utcnow(),
+        }
+        try:
+            if self.overflow == 'block':
+                self._queue.put(record, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            METRICS.inc('events_dropped', cam_id)
+            print(f"[WARN] Event queue full, dropped event for Object ID {track_id} on Camera {cam_id}")
+            return False
+
+    def _write_snapshot(self, record):
+        """Draws the marker and writes the JPEG; returns the path stored in the DB."""
+        # Milliseconds plus a per-writer sequence number: several events of one
+        # track (two zones, enter then dwell) can land in the same second
+        timestamp = record['local_time'].strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        suffix = f"_{record['event_type']}" if record['event_type'] else ""
+        img_name = (f"intrusion_{record['cam_id']}_{timestamp}_{next(self._sequence):06d}"
+                    f"_ID{record['track_id']}{suffix}.jpg")
+
+        snapshot = record['frame'].copy()
+        cv2.circle(snapshot, record['center'], 10, (0, 0, 255), -1)
+        cv2.putText(snapshot, f"INTRUSION ID:{record['track_id']}", (20, 40),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+        img_full_path = os.path.join(self.snapshot_dir, img_name)
+        cv2.imwrite(img_full_path, snapshot)
+        print(f"[INFO] Intrusion snapshot saved: {img_full_path}")
+        # Always forward slash for DB storage / URL
+        image_path = f"intrusion_snaps/{img_name}"
+        if self.thumbnailer is not None:
+            try:
+                with METRICS.timed(record['cam_id'], 'thumbnail_write'):
+                    self.thumbnailer.write(snapshot, image_path)
+            except Exception as e:
+                # The gallery regenerates a missing thumbnail on first request
+                print(f"[WARN] Failed to write thumbnail for {img_name}: {e}")
+        return image_path
+
+    def _commit(self, events, attempts=3):
+        """Inserts a batch in one transaction, retrying while SQLite is locked."""
+        for attempt in range(attempts):
+            try:
+                with self.app.app_context():
+                    db.session.add_all(events)
+                    db.session.commit()
+                return True
+            except Exception as e:
+                with self.app.app_context():
+                    db.session.rollback()
+                if attempt == attempts - 1:
+                    print(f"[ERROR] Failed to log {len(events)} intrusion events to database: {e}")
+                    return False
+                time.sleep(0.1 * (attempt + 1))
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            record = self._queue.get()
+            batch = []
+            # Drain whatever else is already waiting, up to one batch
+            while True:
+                if record is None:
+                    stopping = True
+                else:
+                    batch.append(record)
+                if stopping or len(batch) >= self.batch_size:
+                    break
+                try:
+                    record = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            events, cam_ids = [], []
+            for record in batch:
+                try:
+                    with METRICS.timed(record['cam_id'], 'snapshot_write'):
+                        image_path = self._write_snapshot(record)
+                except Exception as e:
+                    print(f"[ERROR] Failed to save intrusion snapshot: {e}")
+                    self.failed += 1
+                    continue
+                events.append(FenceCrossEvent(
+                    cam_id=record['cam_id'],
+                    image_path=image_path,
+                    direction=record['direction'],
+                    event_type=record['event_type'],
+                    zone_id=record['zone_id'],
+                    track_id=int(record['track_id']),
+                    bbox_x1=record['box'][0],
+                    bbox_y1=record['box'][1],
+                    bbox_x2=record['box'][2],
+                    bbox_y2=record['box'][3],
+                    confidence=record['confidence'],
+                    timestamp=record['utc_time'],  # Explicitly set UTC timestamp
+                ))
+                cam_ids.append(record['cam_id'])
+            if events:
+                commit_start = time.perf_counter()
+                committed = self._commit(events)
+                METRICS.observe('all', 'db_commit', time.perf_counter() - commit_start)
+                if committed:
+                    for cam_id in cam_ids:
+                        METRICS.inc('events_written', cam_id)
+                    self.written += len(events)
+                    print(f"[INFO] {len(events)} intrusion event(s) logged")
+                else:
+                    self.failed += len(events)
+            self.batches += 1
+            self._write_ms += (time.perf_counter() - start) * 1000.0
+
+    def stop(self, timeout=10.0):
+        """Flushes everything queued so far, then stops the writer thread."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        print(f"[INFO] Event writer stopped ({self.written} written, {self.dropped} dropped)")
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(),
+            'capacity': self._queue.maxsize,
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'batches': self.batches,
+            'avg_batch_ms': round(self._write_ms / self.batches, 1) if self.batches else 0.0,
+            'thumbnails': self.thumbnailer.stats() if self.thumbnailer is not None else None,
+        }
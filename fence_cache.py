@@ -0,0 +1,64 @@
+# fence_cache.py
+
+import threading
+from models import CameraFence, IntrusionZone
+
+
+class FenceCache:
+    """
+    Process-wide, in-memory cache of each camera's fence segments and zones.
+
+    Every cam_id has a version counter that is bumped whenever its geometry
+    is saved or reset. Running pipelines compare versions once per frame (a
+    dict lookup) and pick up new geometry on the next frame, with no per-frame
+    database polling and no stream restart.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self._fences = {}       # {cam_id: fence_data dict or None}
+        self._versions = {}     # {cam_id: int}
+        self._reload_locks = {}  # {cam_id: Lock} serialising reloads of one camera
+
+    def version(self, cam_id):
+        return self._versions.get(str(cam_id), 0)
+
+    def get(self, cam_id):
+        """Returns (version, fence_data), loading from the database on first use."""
+        cam_id = str(cam_id)
+        with self._lock:
+            if cam_id not in self._fences:
+                self._fences[cam_id] = self._load(cam_id)
+                self._versions.setdefault(cam_id, 0)
+            return self._versions[cam_id], self._fences[cam_id]
+
+    def reload(self, cam_id):
+        """Re-reads a camera's geometry after it was edited and bumps its version."""
+        cam_id = str(cam_id)
+        with self._lock:
+            reload_lock = self._reload_locks.setdefault(cam_id, threading.Lock())
+        # Two saves of one camera must not interleave: the older read could be
+        # stored last under the newer version. Other cameras are not held up.
+        with reload_lock:
+            fence_data = self._load(cam_id)
+            with self._lock:
+                self._fences[cam_id] = fence_data
+                version = self._versions[cam_id] = self._versions.get(cam_id, 0) + 1
+        print(f"[INFO] Fence geometry for camera {cam_id} updated (v{version})")
+
+    def _load(self, cam_id):
+        """Fence segments and polygon zones for a camera, or None if it has neither."""
+        with self.app.app_context():
+            fence_db = CameraFence.query.filter_by(cam_id=cam_id).first()
+            zones = [zone.to_dict() for zone in IntrusionZone.query.filter_by(cam_id=cam_id).all()]
+            if not fence_db and not zones:
+                return None
+            fence_data = {'segments': [], 'zones': zones}
+            if fence_db:
+                fence_data.update({
+                    'line_x1': fence_db.line_x1, 'line_y1': fence_db.line_y1,
+                    'line_x2': fence_db.line_x2, 'line_y2': fence_db.line_y2,
+                    'segments': fence_db.segment_list()
+                })
+            return fence_data
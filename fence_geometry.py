@@ -0,0 +1,76 @@
+# fence_geometry.py
+
+import cv2
+import numpy as np
+
+
+def _orientation(ax, ay, bx, by, px, py):
+    """Signed area of (a, b, p); broadcasts over any array shapes."""
+    return (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+
+
+class FenceCrossingEngine:
+    """
+    Holds every fence segment of one camera as an (M, 4) array and tests all
+    movement segments of a frame against all fence segments in one
+    vectorised orientation test.
+
+    Direction is relative to how the segment was drawn: 'entry' means moving
+    from the left-hand side of the segment (looking from its first point to
+    its second) to its right-hand side, 'exit' the opposite.
+    """
+
+    def __init__(self, segments):
+        self.segments = np.asarray(segments, dtype=np.float32).reshape(-1, 4)
+
+    @classmethod
+    def from_fence_data(cls, fence_data):
+        if not fence_data:
+            return cls(np.zeros((0, 4)))
+        if 'segments' in fence_data:
+            return cls(fence_data['segments'])
+        return cls([[
+            fence_data['line_x1'], fence_data['line_y1'],
+            fence_data['line_x2'], fence_data['line_y2']
+        ]])
+
+    def __len__(self):
+        return len(self.segments)
+
+    def crossings(self, starts, ends):
+        """
+        Tests N movements (starts[i] -> ends[i]) against all M fence segments.
+
+        Returns (movement_idx, segment_idx, entering) arrays with one row per
+        movement that crossed, using the first segment it crossed. `entering`
+        is True for an 'entry' crossing.
+        """
+        starts = np.asarray(starts, dtype=np.float32).reshape(-1, 2)
+        ends = np.asarray(ends, dtype=np.float32).reshape(-1, 2)
+        empty = np.zeros(0, dtype=int)
+        if len(starts) == 0 or len(self.segments) == 0:
+            return empty, empty, np.zeros(0, dtype=bool)
+
+        # (N, 1) movement coordinates against (1, M) fence coordinates
+        px, py = starts[:, 0:1], starts[:, 1:2]
+        qx, qy = ends[:, 0:1], ends[:, 1:2]
+        ax, ay, bx, by = (self.segments[:, i][None, :] for i in range(4))
+
+        d_start = _orientation(ax, ay, bx, by, px, py)
+        d_end = _orientation(ax, ay, bx, by, qx, qy)
+        d_a = _orientation(px, py, qx, qy, ax, ay)
+        d_b = _orientation(px, py, qx, qy, bx, by)
+
+        hit = (d_start * d_end <= 0) & (d_a * d_b <= 0)
+        # Stationary points and movement along the fence line are not crossings
+        hit &= ~((d_start == 0) & (d_end == 0))
+        hit &= np.any(starts != ends, axis=1)[:, None]
+
+        crossed = np.flatnonzero(hit.any(axis=1))
+        segment_idx = np.argmax(hit[crossed], axis=1)
+        entering = (d_end[crossed, segment_idx] - d_start[crossed, segment_idx]) > 0
+        return crossed, segment_idx, entering
+
+    def draw(self, image, color=(0, 0, 255), thickness=3):
+        for x1, y1, x2, y2 in self.segments.astype(int):
+            cv2.line(image, (x1, y1), (x2, y2), color, thickness)
@@ -0,0 +1,203 @@
+# inference_backends.py
+
+import os
+import time
+import cv2
+import numpy as np
+from roi import nms
+
+
+class InferenceBackend:
+    """
+    Common interface for person detectors. `detect()` takes one image or a
+    list of BGR images and returns one (boxes, scores) pair of NumPy arrays
+    per image, with boxes as xyxy in that image's pixel coordinates.
+    """
+
+    name = 'base'
+
+    def __init__(self, imgsz=640, threads=0, conf=0.25, iou=0.7, classes=(0,)):
+        self.imgsz = imgsz
+        self.threads = threads
+        self.conf = conf
+        self.iou = iou
+        self.classes = list(classes)    # class 0 is 'person'
+
+    def detect(self, images, imgsz=None, conf=None):
+        raise NotImplementedError
+
+    def warmup(self, runs=2, imgsz=None):
+        """Runs dummy passes so the first real frame doesn't pay for lazy initialisation."""
+        size = imgsz or self.imgsz
+        dummy = np.zeros((size, size, 3), dtype=np.uint8)
+        start = time.perf_counter()
+        for _ in range(runs):
+            self.detect(dummy, imgsz=size)
+        if runs:
+            print(f"[INFO] {self.name} backend warmed up in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+class UltralyticsBackend(InferenceBackend):
+    """PyTorch (or any format ultralytics can load) through YOLO.predict()."""
+
+    name = 'torch'
+
+    def __init__(self, weights='yolov8n.pt', **kwargs):
+        super().__init__(**kwargs)
+        from ultralytics import YOLO
+        if self.threads:
+            import torch
+            torch.set_num_threads(self.threads)
+        self.model = YOLO(weights)
+
+    def detect(self, images, imgsz=None, conf=None):
+        single = not isinstance(images, list)
+        results = self.model.predict(
+            images, imgsz=imgsz or self.imgsz, conf=self.conf if conf is None else conf,
+            iou=self.iou, classes=self.classes, verbose=False
+        )
+        detections = [(r.boxes.xyxy.cpu().numpy(), r.boxes.conf.cpu().numpy()) for r in results]
+        return detections[0] if single else detections
+
+
+class ExportedYoloBackend(InferenceBackend):
+    """
+    Shared pre/post-processing for exported YOLOv8 graphs (ONNX, OpenVINO):
+    letterbox to a square input, then decode the (B, 4 + classes, N) output
+    with confidence filtering and NumPy NMS.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.fixed_imgsz = None     # Set by subclasses when the graph has a static input size
+
+    def _run(self, batch):
+        raise NotImplementedError
+
+    def _letterbox(self, image, size):
+        h, w = image.shape[:2]
+        gain = min(size / h, size / w)
+        new_w, new_h = int(round(w * gain)), int(round(h * gain))
+        pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+        canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        return canvas, gain, pad_x, pad_y
+
+    def detect(self, images, imgsz=None, conf=None):
+        single = not isinstance(images, list)
+        images = [images] if single else images
+        size = self.fixed_imgsz or imgsz or self.imgsz
+        conf = self.conf if conf is None else conf
+
+        boxed = [self._letterbox(image, size) for image in images]
+        batch = np.stack([b[0] for b in boxed])[..., ::-1].transpose(0, 3, 1, 2)   # BGR->RGB, NHWC->NCHW
+        batch = np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+        output = self._run(batch)
+
+        detections = []
+        for pred, image, (_, gain, pad_x, pad_y) in zip(output, images, boxed):
+            pred = pred.T                                   # (N, 4 + classes)
+            class_scores = pred[:, 4:][:, self.classes]
+            scores = class_scores.max(axis=1)
+            keep = scores >= conf
+            pred, scores = pred[keep], scores[keep]
+            cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+            boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+            keep = nms(boxes, scores, self.iou)
+            boxes, scores = boxes[keep], scores[keep]
+            # Undo the letterbox
+            boxes = (boxes - np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)) / gain
+            boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, image.shape[1])
+            boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, image.shape[0])
+            detections.append((boxes.astype(np.float32), scores.astype(np.float32)))
+        return detections[0] if single else detections
+
+
+class OnnxRuntimeBackend(ExportedYoloBackend):
+    """YOLOv8 exported to ONNX (optionally INT8-quantised), run on ONNX Runtime's CPU provider."""
+
+    name = 'onnx'
+
+    def __init__(self, weights='yolov8n.onnx', **kwargs):
+        super().__init__(**kwargs)
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(weights, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        shape = self.session.get_inputs()[0].shape
+        if isinstance(shape[2], int):
+            self.fixed_imgsz = shape[2]
+        self.fixed_batch = shape[0] if isinstance(shape[0], int) else None
+
+    def _run(self, batch):
+        if self.fixed_batch == 1 and len(batch) > 1:
+            # Static-batch exports have to be fed one image at a time
+            return np.concatenate([self.session.run(None, {self.input_name: b[None]})[0] for b in batch])
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class OpenVinoBackend(ExportedYoloBackend):
+    """YOLOv8 exported to OpenVINO IR (FP32/FP16 or INT8), compiled for the CPU plugin."""
+
+    name = 'openvino'
+
+    def __init__(self, weights='yolov8n_openvino_model', **kwargs):
+        super().__init__(**kwargs)
+        import openvino as ov
+        xml = weights
+        if os.path.isdir(weights):
+            xml = next(os.path.join(weights, f) for f in os.listdir(weights) if f.endswith('.xml'))
+        core = ov.Core()
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if self.threads:
+            config['INFERENCE_NUM_THREADS'] = self.threads
+        model = core.read_model(xml)
+        shape = model.inputs[0].get_partial_shape()
+        if shape[2].is_static:
+            self.fixed_imgsz = shape[2].get_length()
+        self.fixed_batch = shape[0].get_length() if shape[0].is_static else None
+        self.compiled = core.compile_model(model, 'CPU', config)
+        self.output = self.compiled.output(0)
+
+    def _run(self, batch):
+        if self.fixed_batch == 1 and len(batch) > 1:
+            return np.concatenate([self.compiled(b[None])[self.output] for b in batch])
+        return self.compiled(batch)[self.output]
+
+
+BACKENDS = {
+    'torch': UltralyticsBackend,
+    'onnx': OnnxRuntimeBackend,
+    'openvino': OpenVinoBackend,
+}
+
+
+def create_backend(name='torch', weights=None, **kwargs):
+    """Instantiates a backend by name; weights default to the stock yolov8n files."""
+    defaults = {'torch': 'yolov8n.pt', 'onnx': 'yolov8n.onnx', 'openvino': 'yolov8n_openvino_model'}
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](weights=weights or defaults[name], **kwargs)
+
+
+def export_model(weights='yolov8n.pt', fmt='onnx', imgsz=640, int8=False, data='coco8.yaml'):
+    """
+    Exports a PyTorch checkpoint for a CPU backend and returns the output path.
+    ONNX INT8 uses ONNX Runtime dynamic quantisation; OpenVINO INT8 uses
+    ultralytics' NNCF calibration on `data`.
+    """
+    from ultralytics import YOLO
+    model = YOLO(weights)
+    if fmt == 'openvino':
+        return model.export(format='openvino', imgsz=imgsz, int8=int8, data=data if int8 else None)
+
+    path = model.export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+    if int8:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantized = path.replace('.onnx', '_int8.onnx')
+        quantize_dynamic(path, quantized, weight_type=QuantType.QUInt8)
+        path = quantized
+    return path
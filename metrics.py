@@ -0,0 +1,110 @@
+# metrics.py
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds; sized for per-frame stages from sub-millisecond to a stalled second
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in Prometheus layout."""
+
+    def __init__(self, buckets=STAGE_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)    # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # Plain increments: a lost update under a thread switch only skews one sample
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Per-camera, per-stage timing histograms and event counters for the
+    /metrics endpoint. Recording is a perf_counter pair and a bisect, so it
+    stays on in production. Gauges that other components already track
+    (frames read, queue depths) are not duplicated here but pulled in at
+    scrape time by the route.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}       # {(cam_id, stage): Histogram}
+        self._counters = {}     # {(name, cam_id): int}
+
+    def _histogram(self, cam_id, stage):
+        key = (str(cam_id), stage)
+        histogram = self._stages.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(key, Histogram())
+        return histogram
+
+    def observe(self, cam_id, stage, seconds):
+        self._histogram(cam_id, stage).observe(seconds)
+
+    @contextmanager
+    def timed(self, cam_id, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(cam_id, stage, time.perf_counter() - start)
+
+    def inc(self, name, cam_id, amount=1):
+        key = (name, str(cam_id))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def render(self, prefix='virtualfence'):
+        """Histograms and counters in Prometheus text exposition format."""
+        with self._lock:
+            stages = sorted(self._stages.items())
+            counters = sorted(self._counters.items())
+
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent per frame in each pipeline stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for (cam_id, stage), histogram in stages:
+            labels = f'camera="{escape_label(cam_id)}",stage="{stage}"'
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float('inf'),), list(histogram.counts)):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{{labels}}} {histogram.count}')
+
+        for name in sorted({counter for (counter, _), _ in counters}):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for (counter, cam_id), value in counters:
+                if counter == name:
+                    lines.append(f'{prefix}_{name}_total{{camera="{escape_label(cam_id)}"}} {value}')
+        return lines
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def gauge_lines(name, help_text, samples, prefix='virtualfence', metric_type='gauge'):
+    """Formats (labels, value) samples, labels being ((name, value), ...), as one metric family."""
+    lines = [f"# HELP {prefix}_{name} {help_text}", f"# TYPE {prefix}_{name} {metric_type}"]
+    for labels, value in samples:
+        if value is None:
+            continue
+        label_text = ','.join(f'{k}="{escape_label(v)}"' for k, v in labels)
+        lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text else f"{prefix}_{name} {value}")
+    return lines
+
+
+# Process-wide registry shared by the pipelines, the detection manager and the event writer
+METRICS = MetricsRegistry()
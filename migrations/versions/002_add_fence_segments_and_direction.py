@@ -0,0 +1,25 @@
+"""Add multi-segment fences and crossing direction
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # JSON list of [x1, y1, x2, y2] segments; NULL keeps the single line_x1..line_y2 fence
+    op.add_column('camera_fences', sa.Column('segments', sa.Text(), nullable=True))
+    # 'entry' / 'exit' direction of the crossing
+    op.add_column('fence_cross_events', sa.Column('direction', sa.String(10), nullable=True))
+
+def downgrade():
+    op.drop_column('fence_cross_events', 'direction')
+    op.drop_column('camera_fences', 'segments')
@@ -0,0 +1,38 @@
+"""Add polygon intrusion zones and zone events
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'intrusion_zones',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cam_id', sa.String(50), nullable=False),
+        sa.Column('name', sa.String(100), nullable=True),
+        sa.Column('points', sa.Text(), nullable=False),
+        sa.Column('frame_width', sa.Integer(), nullable=True),
+        sa.Column('frame_height', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_intrusion_zones_cam_id', 'intrusion_zones', ['cam_id'])
+    # Zone events share the event table with fence crossings
+    op.add_column('fence_cross_events', sa.Column('event_type', sa.String(20), nullable=True))
+    op.add_column('fence_cross_events', sa.Column('zone_id', sa.Integer(), nullable=True))
+
+def downgrade():
+    op.drop_column('fence_cross_events', 'zone_id')
+    op.drop_column('fence_cross_events', 'event_type')
+    op.drop_index('ix_intrusion_zones_cam_id', table_name='intrusion_zones')
+    op.drop_table('intrusion_zones')
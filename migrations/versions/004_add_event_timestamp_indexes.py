@@ -0,0 +1,25 @@
+"""Index fence cross events for paginated, per-camera history
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # (timestamp, id) is the keyset order of /logs and /saved_snaps; the cam_id
+    # prefix serves the same pages filtered to one camera
+    op.create_index('ix_fence_cross_events_cam_id_timestamp', 'fence_cross_events', ['cam_id', 'timestamp', 'id'])
+    op.create_index('ix_fence_cross_events_timestamp_id', 'fence_cross_events', ['timestamp', 'id'])
+
+def downgrade():
+    op.drop_index('ix_fence_cross_events_timestamp_id', table_name='fence_cross_events')
+    op.drop_index('ix_fence_cross_events_cam_id_timestamp', table_name='fence_cross_events')
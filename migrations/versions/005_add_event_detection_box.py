@@ -0,0 +1,32 @@
+"""Store the intruder's box, track id and confidence with each event
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Nullable: events logged before this revision have no detection recorded
+    op.add_column('fence_cross_events', sa.Column('track_id', sa.Integer(), nullable=True))
+    op.add_column('fence_cross_events', sa.Column('bbox_x1', sa.Integer(), nullable=True))
+    op.add_column('fence_cross_events', sa.Column('bbox_y1', sa.Integer(), nullable=True))
+    op.add_column('fence_cross_events', sa.Column('bbox_x2', sa.Integer(), nullable=True))
+    op.add_column('fence_cross_events', sa.Column('bbox_y2', sa.Integer(), nullable=True))
+    op.add_column('fence_cross_events', sa.Column('confidence', sa.Float(), nullable=True))
+
+def downgrade():
+    op.drop_column('fence_cross_events', 'confidence')
+    op.drop_column('fence_cross_events', 'bbox_y2')
+    op.drop_column('fence_cross_events', 'bbox_x2')
+    op.drop_column('fence_cross_events', 'bbox_y1')
+    op.drop_column('fence_cross_events', 'bbox_x1')
+    op.drop_column('fence_cross_events', 'track_id')
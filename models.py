@@ -1,5 +1,6 @@
 from extensions import db
 from datetime import datetime
+import json
 
 class CameraFence(db.Model):
     __tablename__ = 'camera_fences'
@@ -9,8 +10,32 @@ class CameraFence(db.Model):
     line_y1 = db.Column(db.Float, nullable=False)
     line_x2 = db.Column(db.Float, nullable=False)
     line_y2 = db.Column(db.Float, nullable=False)
+    segments = db.Column(db.Text, nullable=True)  # JSON [[x1, y1, x2, y2], ...] for multi-segment fences
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    def segment_list(self):
+        """All fence segments; single-line fences fall back to line_x1..line_y2."""
+        if self.segments:
+            return json.loads(self.segments)
+        return [[self.line_x1, self.line_y1, self.line_x2, self.line_y2]]
+
+
+class IntrusionZone(db.Model):
+    __tablename__ = 'intrusion_zones'
+    id = db.Column(db.Integer, primary_key=True)
+    cam_id = db.Column(db.String(50), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=True)
+    points = db.Column(db.Text, nullable=False)  # JSON [[x, y], ...] polygon vertices
+    frame_width = db.Column(db.Integer, nullable=True)   # Resolution the points were drawn in
+    frame_height = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'name': self.name, 'points': json.loads(self.points),
+            'frame_width': self.frame_width, 'frame_height': self.frame_height
+        }
+
 
 class FenceCrossEvent(db.Model):
     __tablename__ = 'fence_cross_events'
@@ -18,4 +43,27 @@ class FenceCrossEvent(db.Model):
     cam_id = db.Column(db.String(50), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     image_path = db.Column(db.String(200), nullable=False)  # path to saved frame
-    enhanced_image_path = db.Column(db.String(200), nullable=True)  # path to enhanced frame
\ No newline at end of file
+    enhanced_image_path = db.Column(db.String(200), nullable=True)  # path to enhanced frame
+    direction = db.Column(db.String(10), nullable=True)  # 'entry' or 'exit' relative to the fence segment
+    event_type = db.Column(db.String(20), nullable=True)  # NULL = fence crossing, else 'zone_enter'/'zone_leave'/'zone_dwell'
+    zone_id = db.Column(db.Integer, nullable=True)
+    # Detection that raised the event, in snapshot pixels; NULL for events logged before 005
+    track_id = db.Column(db.Integer, nullable=True)
+    bbox_x1 = db.Column(db.Integer, nullable=True)
+    bbox_y1 = db.Column(db.Integer, nullable=True)
+    bbox_x2 = db.Column(db.Integer, nullable=True)
+    bbox_y2 = db.Column(db.Integer, nullable=True)
+    confidence = db.Column(db.Float, nullable=True)
+
+    __table_args__ = (
+        # Per-camera history pages, and keyset pagination over all cameras
+        db.Index('ix_fence_cross_events_cam_id_timestamp', 'cam_id', 'timestamp', 'id'),
+        db.Index('ix_fence_cross_events_timestamp_id', 'timestamp', 'id'),
+    )
+
+    @property
+    def bbox(self):
+        """(x1, y1, x2, y2) of the intruder, or None if it was not recorded."""
+        if self.bbox_x1 is None:
+            return None
+        return (self.bbox_x1, self.bbox_y1, self.bbox_x2, self.bbox_y2)
\ No newline at end of file
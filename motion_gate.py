@@ -0,0 +1,138 @@
+# motion_gate.py
+
+import time
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    Cheap pre-stage that decides whether a frame is worth running YOLO on.
+
+    Frames are downscaled to `scale_width` pixels wide, converted to gray and
+    compared against a running-average background, only inside a region
+    around the camera's fence segments and zones. If the fraction of changed
+    pixels in that region stays below `threshold`, inference is skipped. A
+    full inference still runs at least every `max_skip_frames` frames so
+    slow or stationary objects are re-checked.
+
+    Only an empty scene is skipped: while the tracker holds any track the
+    caller passes tracking=True and every frame runs, because a gap in
+    detections breaks track continuity and with it the crossing check.
+
+    A pixel counts as changed when it differs from the background by more
+    than `pixel_delta` gray levels, or by `noise_factor` times the scene's
+    measured noise if that is higher, so low-contrast people still register
+    on clean cameras without noisy ones triggering on every frame.
+    """
+
+    def __init__(self, threshold=0.002, pixel_delta=8, scale_width=160, roi_margin=0.1,
+                 max_skip_frames=30, learning_rate=0.05, noise_factor=4.0):
+        self.threshold = threshold              # Fraction of ROI pixels that must change
+        self.pixel_delta = pixel_delta          # Minimum per-pixel gray difference counted as change
+        self.noise_factor = noise_factor
+        self.scale_width = scale_width
+        self.roi_margin = roi_margin            # Region padding, as a fraction of frame width
+        self.max_skip_frames = max_skip_frames
+        self.learning_rate = learning_rate
+
+        self._background = None
+        self._roi = None
+        self._roi_pixels = 1
+        self._region_fence = None   # The fence dict the ROI was built from, compared by identity
+        self._region_size = None
+        self._skipped_in_row = 0
+        self._noise = 0.0           # Running estimate of background noise (gray levels)
+
+        self.frames = 0
+        self.skipped = 0
+        self.gate_seconds = 0.0     # Time spent in the gate itself
+        self.last_motion = 0.0      # Changed-pixel fraction of the last frame
+        self.forced_by_tracks = 0   # Quiet frames run anyway because tracks were live
+
+    def set_region(self, fence_data, width, height):
+        """Rebuilds the downscaled ROI mask when the fence or resolution changes."""
+        # Keep the fence object itself: an id() of a freed dict can be reused by the next one
+        if fence_data is self._region_fence and (width, height) == self._region_size:
+            return
+        self._region_fence = fence_data
+        self._region_size = (width, height)
+
+        scale = self.scale_width / float(width)
+        small_h = max(1, int(round(height * scale)))
+        margin = max(1, int(round(self.roi_margin * self.scale_width)))
+        segments = fence_data.get('segments') if fence_data else None
+        zones = fence_data.get('zones') if fence_data else None
+
+        if not segments and not zones:
+            roi = np.full((small_h, self.scale_width), 255, dtype=np.uint8)
+        else:
+            roi = np.zeros((small_h, self.scale_width), dtype=np.uint8)
+            for x1, y1, x2, y2 in segments or []:
+                p1 = (int(x1 * scale), int(y1 * scale))
+                p2 = (int(x2 * scale), int(y2 * scale))
+                cv2.line(roi, p1, p2, 255, 2 * margin)
+            for zone in zones or []:
+                points = np.asarray(zone['points'], dtype=np.float32).reshape(-1, 2)
+                src_w, src_h = zone.get('frame_width'), zone.get('frame_height')
+                if src_w and src_h:
+                    points *= np.array([width / src_w, height / src_h], dtype=np.float32)
+                polygon = np.round(points * scale).astype(np.int32)
+                cv2.fillPoly(roi, [polygon], 255)
+                cv2.polylines(roi, [polygon], True, 255, 2 * margin)
+
+        self._roi = roi > 0
+        self._roi_pixels = max(1, int(self._roi.sum()))
+        self._background = None
+
+    def should_infer(self, frame, tracking=False):
+        """Returns True if the model should run on this frame; `tracking` means tracks are live."""
+        start = time.perf_counter()
+        self.frames += 1
+
+        height, width = frame.shape[:2]
+        small_h = self._roi.shape[0] if self._roi is not None else int(height * self.scale_width / width)
+        small = cv2.resize(frame, (self.scale_width, small_h), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0).astype(np.float32)
+
+        if self._background is None:
+            self._background = gray
+            self.gate_seconds += time.perf_counter() - start
+            return True
+
+        diff = cv2.absdiff(gray, self._background)
+        roi_diff = diff[self._roi] if self._roi is not None else diff
+        # The median difference tracks sensor noise; a person covers far less than half the region
+        noise = float(np.median(roi_diff)) if roi_diff.size else 0.0
+        self._noise = noise if self._noise == 0.0 else 0.95 * self._noise + 0.05 * noise
+        changed = roi_diff > max(self.pixel_delta, self.noise_factor * self._noise)
+        self.last_motion = changed.sum() / self._roi_pixels
+        cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+
+        infer = self.last_motion >= self.threshold or self._skipped_in_row >= self.max_skip_frames
+        if not infer and tracking:
+            infer = True
+            self.forced_by_tracks += 1
+        if infer:
+            self._skipped_in_row = 0
+        else:
+            self._skipped_in_row += 1
+            self.skipped += 1
+        self.gate_seconds += time.perf_counter() - start
+        return infer
+
+    def stats(self, inference_ms=None):
+        """Skip ratio and, given the mean inference time, the CPU time saved."""
+        stats = {
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'skip_ratio': round(self.skipped / self.frames, 3) if self.frames else 0.0,
+            'last_motion': round(float(self.last_motion), 5),
+            'threshold': self.threshold,
+            'pixel_delta': round(max(self.pixel_delta, self.noise_factor * self._noise), 1),
+            'forced_by_tracks': self.forced_by_tracks,
+            'gate_ms_avg': round(self.gate_seconds / self.frames * 1000.0, 3) if self.frames else 0.0,
+        }
+        if inference_ms is not None:
+            stats['cpu_ms_saved'] = round(self.skipped * inference_ms - self.gate_seconds * 1000.0, 1)
+        return stats
@@ -0,0 +1,64 @@
+# output_stage.py
+
+import time
+
+import cv2
+import numpy as np
+
+BOUNDARY_HEADER = b'--frame\r\nContent-Type: image/jpeg\r\n\r\n'
+
+
+class FrameEncoder:
+    """
+    Encodes a camera's annotated frames once for every viewer.
+
+    Frames are optionally downscaled into a preallocated buffer, JPEG-encoded
+    at a fixed quality, and wrapped in the multipart boundary in a single
+    join, so each published frame is one immutable bytes object that every
+    subscriber can write as-is.
+    """
+
+    def __init__(self, quality=95, scale=1.0):
+        self.quality = int(quality)
+        self.scale = float(scale)
+        self._params = [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+        self._resized = None        # Preallocated downscale target
+
+        self.frames = 0
+        self.buffer_allocations = 0     # (Re)allocations of the downscale buffer
+        self.bytes_out = 0
+        self._encode_ms = 0.0
+
+    def _scaled(self, frame):
+        if self.scale == 1.0:
+            return frame
+        height, width = frame.shape[:2]
+        size = (max(1, int(width * self.scale)), max(1, int(height * self.scale)))
+        if self._resized is None or self._resized.shape[1::-1] != size:
+            self._resized = np.empty((size[1], size[0]) + frame.shape[2:], dtype=frame.dtype)
+            self.buffer_allocations += 1
+        cv2.resize(frame, size, dst=self._resized, interpolation=cv2.INTER_AREA)
+        return self._resized
+
+    def encode(self, frame):
+        """Returns the multipart chunk for one frame, or None if encoding failed."""
+        start = time.perf_counter()
+        ret, jpeg = cv2.imencode('.jpg', self._scaled(frame), self._params)
+        if not ret:
+            return None
+        # One copy from the encoder's array straight into the shared chunk
+        chunk = b''.join((BOUNDARY_HEADER, jpeg, b'\r\n'))
+        self._encode_ms += (time.perf_counter() - start) * 1000.0
+        self.frames += 1
+        self.bytes_out += len(chunk)
+        return chunk
+
+    def stats(self):
+        return {
+            'quality': self.quality,
+            'scale': self.scale,
+            'frames_encoded': self.frames,
+            'encode_ms_avg': round(self._encode_ms / self.frames, 2) if self.frames else 0.0,
+            'kb_per_frame': round(self.bytes_out / self.frames / 1024.0, 1) if self.frames else 0.0,
+            'buffer_allocations': self.buffer_allocations,
+        }
@@ -0,0 +1,91 @@
+# quality_controller.py
+
+import numpy as np
+
+
+class QualityController:
+    """
+    Per-camera control loop that trades accuracy for speed to hold a target
+    frame rate.
+
+    The controlled quantity is the model cost per input frame: mean inference
+    latency divided by the detection stride. When that exceeds the budget
+    (1 / target_fps), the controller degrades one step at a time: lower input
+    size, then larger stride (detect every Nth frame), then a higher
+    confidence threshold. With plenty of headroom it restores quality in the
+    reverse order. Every knob stays within its configured bounds.
+    """
+
+    def __init__(self, target_fps=10.0, imgsz_min=320, imgsz_max=640, max_stride=4,
+                 conf_min=0.25, conf_max=0.5, window=15, headroom=0.6):
+        self.budget_ms = 1000.0 / target_fps
+        self.imgsz_levels = list(range(imgsz_max, imgsz_min - 1, -64)) or [imgsz_max]
+        if self.imgsz_levels[-1] != imgsz_min:
+            self.imgsz_levels.append(imgsz_min)
+        self.max_stride = max_stride
+        self.conf_levels = list(np.round(np.linspace(conf_min, conf_max, 4), 3))
+        self.window = window                # Samples between decisions
+        self.headroom = headroom            # Upgrade only below this fraction of the budget
+
+        self._imgsz_level = 0
+        self.stride = 1
+        self._conf_level = 0
+        self._latencies = []
+        self._frame = 0
+        self.adjustments = 0
+
+    @property
+    def imgsz(self):
+        return self.imgsz_levels[self._imgsz_level]
+
+    @property
+    def conf(self):
+        return float(self.conf_levels[self._conf_level])
+
+    def should_process(self):
+        """Stride gate: True on every `stride`-th frame."""
+        self._frame += 1
+        return self._frame % self.stride == 0
+
+    def record(self, latency_ms):
+        """Feeds one measured inference latency and adjusts the knobs when a window is full."""
+        self._latencies.append(latency_ms)
+        if len(self._latencies) >= self.window:
+            self._adjust(float(np.mean(self._latencies)))
+            self._latencies = []
+
+    def _adjust(self, latency_ms):
+        cost = latency_ms / self.stride
+        if cost > self.budget_ms:
+            if self._imgsz_level < len(self.imgsz_levels) - 1:
+                self._imgsz_level += 1
+            elif self.stride < self.max_stride:
+                self.stride += 1
+            elif self._conf_level < len(self.conf_levels) - 1:
+                self._conf_level += 1
+            else:
+                return
+        elif cost < self.budget_ms * self.headroom:
+            if self._conf_level > 0:
+                self._conf_level -= 1
+            elif self.stride > 1:
+                # Only step back if the smaller stride would still fit the budget
+                if latency_ms / (self.stride - 1) > self.budget_ms:
+                    return
+                self.stride -= 1
+            elif self._imgsz_level > 0:
+                self._imgsz_level -= 1
+            else:
+                return
+        else:
+            return
+        self.adjustments += 1
+
+    def stats(self):
+        return {
+            'imgsz': self.imgsz,
+            'stride': self.stride,
+            'conf': self.conf,
+            'budget_ms': round(self.budget_ms, 1),
+            'adjustments': self.adjustments,
+        }
@@ -0,0 +1,80 @@
+# roi.py
+
+import numpy as np
+
+
+def fence_roi(fence_data, width, height, margin=0.1, max_area_ratio=0.8):
+    """
+    Inference region of interest around a camera's fence segments and zones.
+
+    Returns (x1, y1, x2, y2) padded by `margin` (a fraction of the frame's
+    longer side), or None when there is no geometry or the region covers so
+    much of the frame that cropping would not pay off.
+    """
+    if not fence_data:
+        return None
+    points = []
+    for x1, y1, x2, y2 in fence_data.get('segments') or []:
+        points.extend([(x1, y1), (x2, y2)])
+    for zone in fence_data.get('zones') or []:
+        zone_points = np.asarray(zone['points'], dtype=np.float32).reshape(-1, 2)
+        src_w, src_h = zone.get('frame_width'), zone.get('frame_height')
+        if src_w and src_h:
+            zone_points *= np.array([width / src_w, height / src_h], dtype=np.float32)
+        points.extend(zone_points.tolist())
+    if not points:
+        return None
+
+    points = np.asarray(points, dtype=np.float32)
+    pad = margin * max(width, height)
+    x1 = int(max(0, points[:, 0].min() - pad))
+    y1 = int(max(0, points[:, 1].min() - pad))
+    x2 = int(min(width, points[:, 0].max() + pad))
+    y2 = int(min(height, points[:, 1].max() + pad))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    if (x2 - x1) * (y2 - y1) > max_area_ratio * width * height:
+        return None
+    return x1, y1, x2, y2
+
+
+def split_tiles(roi, tile_size, overlap=0.2):
+    """
+    Splits an ROI into tiles of at most `tile_size` pixels per side that
+    overlap by `overlap` so objects on a seam appear whole in one tile.
+    A `tile_size` of 0 returns the ROI as a single tile.
+    """
+    x1, y1, x2, y2 = roi
+    if not tile_size or (x2 - x1 <= tile_size and y2 - y1 <= tile_size):
+        return [roi]
+
+    step = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(lo, hi):
+        if hi - lo <= tile_size:
+            return [lo]
+        positions = list(range(lo, hi - tile_size, step))
+        positions.append(hi - tile_size)
+        return positions
+
+    return [(tx, ty, min(tx + tile_size, x2), min(ty + tile_size, y2))
+            for ty in starts(y1, y2) for tx in starts(x1, x2)]
+
+
+def nms(boxes, scores, iou_threshold=0.5):
+    """Plain NumPy non-maximum suppression; returns the indices to keep."""
+    if len(boxes) == 0:
+        return np.zeros(0, dtype=int)
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while len(order):
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        h = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        inter = w * h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        order = rest[iou < iou_threshold]
+    return np.array(keep, dtype=int)
@@ -1,26 +1,48 @@
 # routes.py (Final Corrected Version)
 
-from flask import Blueprint, render_template, Response, request, jsonify, url_for
-import cv2
+from flask import Blueprint, render_template, Response, request, jsonify, url_for, send_from_directory
 import os
 from extensions import db
-from models import CameraFence, FenceCrossEvent
+from models import CameraFence, FenceCrossEvent, IntrusionZone
 from flask import current_app
 import base64
-from image_enhancement import enhance_image
+from camera_pipeline import StreamViewer
+from metrics import METRICS, gauge_lines
+from sampling_profiler import PROFILER
 from datetime import datetime
+import atexit
+import json
 import pytz
+import time
 
 routes_bp = Blueprint('main', __name__)
 
-# This global will be initialized when the app starts
+# These globals will be initialized when the app starts
 detection_manager = None
+pipeline_manager = None
+fence_cache = None
+enhancement_jobs = None
 
 def init_detection_manager(app):
-    """Factory to create the detection manager instance."""
-    global detection_manager
+    """Factory to create the detection manager and the shared camera pipelines."""
+    global detection_manager, pipeline_manager, fence_cache, enhancement_jobs
     from detection_utils import DetectionManager
+    from camera_pipeline import PipelineManager
+    from enhancement_jobs import EnhancementJobQueue
+    from fence_cache import FenceCache
     detection_manager = DetectionManager(app)
+    fence_cache = FenceCache(app)
+    pipeline_manager = PipelineManager(
+        detection_manager, fence_cache, idle_timeout=app.config.get('PIPELINE_IDLE_TIMEOUT', 5.0)
+    )
+    enhancement_jobs = EnhancementJobQueue(
+        app,
+        app.static_folder,
+        workers=app.config.get('ENHANCE_WORKERS', 1),
+        max_pending=app.config.get('ENHANCE_MAX_PENDING', 16),
+        roi_margin=app.config.get('ENHANCE_ROI_MARGIN', 0.25),
+    )
+    atexit.register(enhancement_jobs.stop)
 
 # --- WEB PAGE ROUTES ---
 
@@ -28,19 +50,41 @@ def init_detection_manager(app):
 def home():
     return render_template('home.html')
 
-@routes_bp.route('/logs')
-def logs():
+def _event_page(with_day_counts=False):
+    """Runs the paginated event query from the shared filter/cursor query parameters."""
+    from event_queries import query_events, parse_date
+
     # Get the local timezone
     local_tz = pytz.timezone('Asia/Kolkata')  # Change this to your local timezone
-    
-    with current_app.app_context():
-        events = FenceCrossEvent.query.order_by(FenceCrossEvent.timestamp.desc()).all()
-        
-        # Convert UTC timestamps to local time for display
-        for event in events:
-            event.display_time = event.timestamp.replace(tzinfo=pytz.UTC).astimezone(local_tz)
-            
-    return render_template('logs.html', events=events)
+
+    filters = {
+        'cam_id': request.args.get('cam_id') or None,
+        'date_from': request.args.get('date_from') or None,
+        'date_to': request.args.get('date_to') or None,
+        'limit': request.args.get('limit', 50, type=int),
+    }
+    page = query_events(
+        local_tz,
+        cam_id=filters['cam_id'],
+        date_from=parse_date(filters['date_from']),
+        date_to=parse_date(filters['date_to']),
+        before=request.args.get('before', type=int),
+        after=request.args.get('after', type=int),
+        limit=filters['limit'],
+        with_day_counts=with_day_counts,
+    )
+    # Only the non-empty filters are carried into the Older/Newer links
+    filters = {name: value for name, value in filters.items() if value}
+    return page, filters
+
+@routes_bp.route('/logs')
+def logs():
+    from event_queries import camera_ids
+
+    with detection_manager.app.app_context():
+        page, filters = _event_page()
+        cameras = camera_ids()
+    return render_template('logs.html', events=page.events, page=page, filters=filters, cameras=cameras)
 
 @routes_bp.route('/camera')
 def camera():
@@ -58,52 +102,53 @@ def view_camera(cam_id):
     # <<< FIX #2: Changed current_app to detection_manager.app >>>
     with detection_manager.app.app_context():
         fence = CameraFence.query.filter_by(cam_id=cam_id).first()
+        zones = [zone.to_dict() for zone in IntrusionZone.query.filter_by(cam_id=cam_id).all()]
         
         video_width, video_height = 640, 480  # Default fallback
-        try:
-            source = int(cam_id) if cam_id.isdigit() else cam_id
-            cap = cv2.VideoCapture(source)
-            if cap.isOpened():
-                video_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                video_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            cap.release()
-        except Exception:
+        # Ask the camera's pipeline rather than opening the device a second time
+        frame_size = pipeline_manager.frame_size(cam_id)
+        if frame_size:
+            video_width, video_height = frame_size
+        else:
             print(f"Could not determine resolution for {cam_id}. Using defaults.")
 
     return render_template(
         'camera_view.html', 
         cam_id=cam_id, 
         fence=fence, 
+        zones=zones, 
         video_width=video_width, 
         video_height=video_height
     )
 
 @routes_bp.route('/saved_snaps')
 def saved_snaps():
-    """Display all saved intrusion snapshots grouped by date."""
-    from collections import defaultdict
-    import os
-
-    # Get the local timezone
-    local_tz = pytz.timezone('Asia/Kolkata')  # Change this to your local timezone
+    """Display saved intrusion snapshots grouped by date, one page at a time."""
+    from event_queries import camera_ids
 
     with detection_manager.app.app_context():
-        # Fetch all events ordered by newest first
-        events = FenceCrossEvent.query.order_by(FenceCrossEvent.timestamp.desc()).all()
+        page, filters = _event_page(with_day_counts=True)
+        cameras = camera_ids()
 
-    # Group events by date (YYYY-MM-DD)
-    grouped_events = defaultdict(list)
-    for event in events:
-        # Convert UTC timestamp to local time
-        local_time = event.timestamp.replace(tzinfo=pytz.UTC).astimezone(local_tz)
-        date_str = local_time.strftime("%Y-%m-%d")
-        event.display_time = local_time  # Add local time for display
-        grouped_events[date_str].append(event)
-
-    # Sort dates in descending order
-    grouped_events = dict(sorted(grouped_events.items(), reverse=True))
+    return render_template(
+        'saved_snaps.html', grouped_events=page.grouped(), page=page, filters=filters, cameras=cameras
+    )
 
-    return render_template('saved_snaps.html', grouped_events=grouped_events)
+@routes_bp.route('/thumbs/<int:snap_id>')
+def snap_thumb(snap_id):
+    """Gallery thumbnail for a snapshot, made on first request if the writer did not."""
+    with detection_manager.app.app_context():
+        image_path = db.session.query(FenceCrossEvent.image_path).filter_by(id=snap_id).scalar()
+    thumb_path = detection_manager.thumbnailer.ensure(image_path) if image_path else None
+    if thumb_path is None:
+        return jsonify({'error': 'Thumbnail not available'}), 404
+
+    # Snapshots are never rewritten, so browsers may keep the thumbnail for a
+    # year; the ETag and conditional handling come from send_from_directory
+    response = send_from_directory(detection_manager.thumbnailer.static_dir, thumb_path, max_age=31536000)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 @routes_bp.route('/view_snap/<int:snap_id>')
 def view_snap(snap_id):
@@ -118,42 +163,57 @@ def view_snap(snap_id):
 
 @routes_bp.route('/enhance_snap/<int:snap_id>', methods=['POST'])
 def enhance_snap(snap_id):
-    """Enhance a snapshot using AI-based image enhancement."""
+    """Queue AI-based enhancement of a snapshot; poll the returned status_url for the result."""
+    from enhancement_jobs import QueueFull
+    from image_enhancement import ENHANCE_MODES
+
+    # Preset from the JSON body or ?mode=, else the configured default
+    mode = (request.get_json(silent=True) or {}).get('mode') or request.args.get('mode') \
+        or current_app.config.get('ENHANCE_MODE', 'quality')
+    if mode not in ENHANCE_MODES:
+        return jsonify({'success': False, 'message': f'Unknown enhancement mode: {mode}'}), 400
+
+    with detection_manager.app.app_context():
+        snap = FenceCrossEvent.query.get_or_404(snap_id)
+        image_path = snap.image_path
+        # Events logged with their detection box get intruder-focused enhancement
+        roi = snap.bbox if current_app.config.get('ENHANCE_ROI', True) else None
+
     try:
-        with detection_manager.app.app_context():
-            snap = FenceCrossEvent.query.get_or_404(snap_id)
-            image_path = os.path.join(current_app.static_folder, snap.image_path)
-            
-            if not os.path.exists(image_path):
-                return jsonify({'success': False, 'message': 'Image file not found'})
-            
-            # Read and enhance the image
-            enhanced_img = enhance_image(image_path)
-            
-            if enhanced_img is None:
-                return jsonify({'success': False, 'message': 'Enhancement failed'})
-                
-            # Save enhanced image
-            enhanced_path = snap.image_path.replace('.jpg', '_enhanced.jpg')
-            enhanced_full_path = os.path.join(current_app.static_folder, enhanced_path)
-            cv2.imwrite(enhanced_full_path, enhanced_img)
-            
-            # Update database
-            snap.enhanced_image_path = enhanced_path
-            db.session.commit()
-            
-            return jsonify({
-                'success': True,
-                'message': 'Image enhanced successfully',
-                'enhanced_path': url_for('static', filename=enhanced_path)
-            })
-            
+        job = enhancement_jobs.submit(snap_id, image_path, mode, roi)
+    except FileNotFoundError:
+        return jsonify({'success': False, 'message': 'Image file not found'}), 404
+    except QueueFull:
+        return jsonify({'success': False, 'message': 'Enhancement queue is full, try again shortly'}), 503
     except Exception as e:
-        print(f"Enhancement error: {str(e)}")  # Log the error
-        return jsonify({
-            'success': False,
-            'message': f'Enhancement failed: {str(e)}'
-        }), 500
+        print(f"[ERROR] Enhancement submit failed: {e}")
+        return jsonify({'success': False, 'message': f'Enhancement failed: {str(e)}'}), 500
+
+    return jsonify(_enhance_job_response(job)), (200 if job['status'] == 'done' else 202)
+
+@routes_bp.route('/enhance_jobs/<job_id>')
+def enhance_job_status(job_id):
+    """Status of an enhancement job; includes enhanced_path once it is done."""
+    job = enhancement_jobs.status(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Unknown or expired job'}), 404
+    return jsonify(_enhance_job_response(job))
+
+def _enhance_job_response(job):
+    response = {
+        'success': job['status'] != 'failed',
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'mode': job['mode'],
+        'status_url': url_for('main.enhance_job_status', job_id=job['job_id']),
+        'elapsed_s': job['elapsed_s'],
+    }
+    if job['status'] == 'done':
+        response['message'] = 'Image enhanced successfully'
+        response['enhanced_path'] = url_for('static', filename=job['result_path'])
+    elif job['status'] == 'failed':
+        response['message'] = f"Enhancement failed: {job['error']}"
+    return response
 
 # --- API AND VIDEO STREAMING ---
 
@@ -175,67 +235,239 @@ def save_line(cam_id):
             if fence:
                 db.session.delete(fence)
                 db.session.commit()
+                fence_cache.reload(cam_id)
                 return jsonify({'message': 'Fence reset successfully!'})
             # If there was no fence to begin with, just confirm.
             return jsonify({'message': 'No fence to reset.'})
         
         # Otherwise, if x1 has a value, we are saving or updating the fence.
         x2, y1, y2 = data['x2'], data['y1'], data['y2']
+        # Optional extra segments: [[x1, y1, x2, y2], ...]; the first one mirrors x1..y2
+        segments = data.get('segments')
+        segments_json = json.dumps([[float(v) for v in seg] for seg in segments]) if segments else None
         if fence:
             # Update existing fence
             fence.line_x1, fence.line_y1, fence.line_x2, fence.line_y2 = x1, y1, x2, y2
+            fence.segments = segments_json
         else:
             # Create a new fence
-            fence = CameraFence(cam_id=cam_id, line_x1=x1, line_y1=y1, line_x2=x2, line_y2=y2)
+            fence = CameraFence(cam_id=cam_id, line_x1=x1, line_y1=y1, line_x2=x2, line_y2=y2,
+                                segments=segments_json)
             db.session.add(fence)
         
         db.session.commit()
+    # Running pipelines switch to the new geometry on their next frame
+    fence_cache.reload(cam_id)
     return jsonify({'message': 'Fence saved successfully!'})
 
 
-def generate_detected_frames(cam_id):
-    """Generator function that yields processed video frames."""
-    source = int(cam_id) if cam_id.isdigit() else cam_id
-    cap = cv2.VideoCapture(source)
+@routes_bp.route('/save_zone/<path:cam_id>', methods=['POST'])
+def save_zone(cam_id):
+    """Creates a polygon intrusion zone from points in native video coordinates."""
+    data = request.get_json()
+    points = data.get('points') or []
+    if len(points) < 3:
+        return jsonify({'message': 'A zone needs at least 3 points.'}), 400
+
+    with detection_manager.app.app_context():
+        zone = IntrusionZone(
+            cam_id=cam_id,
+            name=data.get('name'),
+            points=json.dumps([[float(x), float(y)] for x, y in points]),
+            frame_width=data.get('frame_width'),
+            frame_height=data.get('frame_height')
+        )
+        db.session.add(zone)
+        db.session.commit()
+        fence_cache.reload(cam_id)
+        return jsonify({'message': 'Zone saved successfully!', 'zone': zone.to_dict()})
 
-    if not cap.isOpened():
-        print(f"Failed to open camera: {source}")
-        return
 
+@routes_bp.route('/delete_zone/<int:zone_id>', methods=['POST'])
+def delete_zone(zone_id):
+    with detection_manager.app.app_context():
+        zone = IntrusionZone.query.get_or_404(zone_id)
+        cam_id = zone.cam_id
+        db.session.delete(zone)
+        db.session.commit()
+    fence_cache.reload(cam_id)
+    return jsonify({'message': 'Zone deleted.'})
+
+def generate_detected_frames(cam_id, max_fps=0.0, scale=None):
+    """
+    Generator that streams the shared pipeline's frames to one viewer, at
+    most `max_fps` per second and at the given output scale. While the
+    client is slow to read, newer frames replace older ones instead of
+    queueing, so it always resumes on the latest frame.
+    """
+    viewer = StreamViewer(scale, max_fps)
+    pipeline = pipeline_manager.acquire(cam_id, viewer)
+    interval = 1.0 / max_fps if max_fps else 0.0
     try:
-        fence_data = None
-        # <<< FIX #4: This is the most critical change. Use detection_manager.app >>>
-        with detection_manager.app.app_context():
-            fence_db = CameraFence.query.filter_by(cam_id=str(cam_id)).first()
-            if fence_db:
-                fence_data = {
-                    'line_x1': fence_db.line_x1, 'line_y1': fence_db.line_y1,
-                    'line_x2': fence_db.line_x2, 'line_y2': fence_db.line_y2
-                }
-
-        while cap.isOpened():
-            success, frame = cap.read()
-            if not success:
-                break
-
-            processed_frame = detection_manager.detect_and_track(frame, fence_data, cam_id)
-            
-            ret, buffer = cv2.imencode('.jpg', processed_frame)
-            if ret:
-                yield (b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+        seq = 0
+        next_due = 0.0
+        while True:
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            new_seq, chunk = pipeline.wait_for_frame(seq, scale=viewer.scale)
+            if chunk is None:
+                if not pipeline.running:
+                    break
+                # Timed out, or the frame predates this viewer's scale being encoded
+                seq = new_seq
+                continue
+            if seq:
+                viewer.skipped += new_seq - seq - 1
+            seq = new_seq
+            viewer.sent += 1
+            next_due = time.monotonic() + interval
+            # The same bytes object goes to every viewer at this scale
+            yield chunk
     finally:
-        cap.release()
-        # Ensure cleanup is called, it's good practice
-        if detection_manager:
-            detection_manager.cleanup_camera_state(cam_id)
+        # Only detach this viewer; capture and tracking state keep running
+        pipeline_manager.release(pipeline, viewer)
+
+
+@routes_bp.route('/pipeline_stats')
+@routes_bp.route('/pipeline_stats/<path:cam_id>')
+def pipeline_stats(cam_id=None):
+    """Frames read/dropped/processed and capture-to-display latency per camera."""
+    if not pipeline_manager:
+        return jsonify({'error': 'Detection manager not initialized'}), 500
+    if cam_id is None:
+        return jsonify(pipeline_manager.stats())
+    pipeline = pipeline_manager.get(cam_id)
+    if pipeline is None:
+        return jsonify({'error': f'No pipeline for camera {cam_id}'}), 404
+    return jsonify(pipeline.stats())
+
+
+@routes_bp.route('/event_stats')
+def event_stats():
+    """Queue depth and written/dropped counts of the background event writer."""
+    if not detection_manager:
+        return jsonify({'error': 'Detection manager not initialized'}), 500
+    return jsonify(detection_manager.event_stats())
+
+
+@routes_bp.route('/enhance_stats')
+def enhance_stats():
+    """Pending, completed, cached and merged counts of the enhancement job queue."""
+    if not enhancement_jobs:
+        return jsonify({'error': 'Enhancement queue not initialized'}), 500
+    return jsonify(enhancement_jobs.stats())
+
+
+@routes_bp.route('/worker_stats')
+def worker_stats():
+    """Cameras, frames and mean model time per detection worker process."""
+    if not detection_manager:
+        return jsonify({'error': 'Detection manager not initialized'}), 500
+    return jsonify({'workers': detection_manager.worker_stats() or []})
+
+
+def _local_only():
+    """403 response for non-loopback clients unless METRICS_ALLOW_REMOTE is set, else None."""
+    if current_app.config.get('METRICS_ALLOW_REMOTE') or request.remote_addr in ('127.0.0.1', '::1'):
+        return None
+    return "Forbidden", 403
+
+
+@routes_bp.route('/metrics')
+def metrics():
+    """Per-stage timings, frame counters and queue depths in Prometheus text format."""
+    denied = _local_only()
+    if denied:
+        return denied
+    lines = METRICS.render()
+    if pipeline_manager:
+        pipelines = pipeline_manager.stats()
+        cams = lambda key: [((('camera', cam_id),), s[key]) for cam_id, s in pipelines.items()]
+        lines += gauge_lines('frames_read_total', "Frames read from the capture device.",
+                             cams('frames_read'), metric_type='counter')
+        lines += gauge_lines('frames_dropped_total', "Frames overwritten before detection picked them up.",
+                             cams('frames_dropped'), metric_type='counter')
+        lines += gauge_lines('frames_processed_total', "Frames run through detection and tracking.",
+                             cams('frames_processed'), metric_type='counter')
+        lines += gauge_lines('frames_unrendered_total', "Frames processed with no viewer attached.",
+                             [((('camera', c),), s['output']['frames_unrendered']) for c, s in pipelines.items()],
+                             metric_type='counter')
+        lines += gauge_lines('viewers', "Attached stream viewers.", cams('subscribers'))
+        lines += gauge_lines('latency_p95_seconds', "p95 capture-to-output latency.",
+                             [((('camera', c),), s['latency_ms_p95'] / 1000.0 if s['latency_ms_p95'] is not None else None)
+                              for c, s in pipelines.items()])
+    if detection_manager:
+        events = detection_manager.event_stats()
+        lines += gauge_lines('event_queue_depth', "Events waiting for the background writer.", [((), events['queued'])])
+        lines += gauge_lines('event_queue_capacity', "Bound of the event writer queue.", [((), events['capacity'])])
+        lines += gauge_lines('event_write_failures_total', "Events lost to snapshot or database errors.",
+                             [((), events['failed'])], metric_type='counter')
+        workers = detection_manager.worker_stats() or []
+        lines += gauge_lines('detection_worker_frames_total', "Frames detected per worker process.",
+                             [((('worker', w['worker']),), w['frames']) for w in workers], metric_type='counter')
+        lines += gauge_lines('detection_worker_up', "1 if the worker process is alive.",
+                             [((('worker', w['worker']),), int(w['alive'])) for w in workers])
+        lines += gauge_lines('detection_worker_restarts_total', "Times the worker process was respawned after dying.",
+                             [((('worker', w['worker']),), w['restarts']) for w in workers], metric_type='counter')
+    if enhancement_jobs:
+        enhance = enhancement_jobs.stats()
+        lines += gauge_lines('enhance_jobs_pending', "Enhancement jobs queued or running.", [((), enhance['pending'])])
+        lines += gauge_lines('enhance_cache_hits_total', "Enhancements served from the result cache.",
+                             [((), enhance['cache_hits'])], metric_type='counter')
+    lines += gauge_lines('profiler_running', "1 while the sampling profiler is on.", [((), int(PROFILER.running))])
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+@routes_bp.route('/profiler', methods=['GET'])
+def profiler_status():
+    denied = _local_only()
+    if denied:
+        return denied
+    return jsonify(PROFILER.stats())
+
+
+@routes_bp.route('/profiler/start', methods=['POST'])
+def profiler_start():
+    """Starts sampling every thread's stack; ?interval_ms= sets the period (default 5)."""
+    denied = _local_only()
+    if denied:
+        return denied
+    started = PROFILER.start(request.args.get('interval_ms', 5.0, type=float) / 1000.0)
+    return jsonify(dict(PROFILER.stats(), started=started))
+
+
+@routes_bp.route('/profiler/stop', methods=['POST'])
+def profiler_stop():
+    """Stops sampling and returns the collapsed stacks (flamegraph input)."""
+    denied = _local_only()
+    if denied:
+        return denied
+    PROFILER.stop()
+    return Response(PROFILER.report(request.args.get('limit', 0, type=int)), mimetype='text/plain')
+
+
+@routes_bp.route('/profiler/report')
+def profiler_report():
+    """Collapsed stacks collected so far, without stopping the profiler."""
+    denied = _local_only()
+    if denied:
+        return denied
+    return Response(PROFILER.report(request.args.get('limit', 0, type=int)), mimetype='text/plain')
 
 
 @routes_bp.route('/video_feed_detect/<path:cam_id>')
 def video_feed_detect(cam_id):
     """Stream video feed with detections"""
-    if not detection_manager:
+    if not detection_manager or not pipeline_manager:
         return "Detection manager not initialized", 500
-    return Response(generate_detected_frames(cam_id),
+    # Optional per-client limits, e.g. ?fps=2&scale=0.25 for a thumbnail grid
+    max_fps = request.args.get('fps', 0.0, type=float)
+    max_fps = min(max_fps, 60.0) if max_fps > 0 else 0.0
+    scale = request.args.get('scale', type=float)
+    # Clamp and round so there are only a few distinct scales to encode
+    scale = round(min(max(scale, 0.05), 1.0), 2) if scale is not None and scale > 0 else None
+    return Response(generate_detected_frames(cam_id, max_fps, scale),
                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
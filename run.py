@@ -2,9 +2,11 @@ from flask import Flask
 from flask_migrate import Migrate
 from routes import routes_bp
 from extensions import db
+import argparse
 import os
+import time
 
-def create_app():
+def create_app(with_detection=True):
     app = Flask(__name__)
 
     # Configure DB (SQLite for now; can change later)
@@ -12,6 +14,104 @@ def create_app():
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.secret_key = os.environ.get('SECRET_KEY', 'supersecretkey')
 
+    # Seconds a camera pipeline keeps running after its last viewer leaves
+    app.config['PIPELINE_IDLE_TIMEOUT'] = float(os.environ.get('PIPELINE_IDLE_TIMEOUT', 5.0))
+    # p95 capture-to-display latency target reported by /pipeline_stats
+    app.config['LATENCY_SLO_MS'] = float(os.environ.get('LATENCY_SLO_MS', 500))
+    # Seconds between supervisor passes that (re)start pipelines for fenced cameras
+    app.config['MONITOR_INTERVAL'] = float(os.environ.get('MONITOR_INTERVAL', 5.0))
+
+    # Port for the asyncio MJPEG server (stream_server.py) that serves many
+    # concurrent viewers without a thread each; 0 disables it
+    app.config['STREAM_SERVER_PORT'] = int(os.environ.get('STREAM_SERVER_PORT', 0))
+
+    # MJPEG output: JPEG quality (1-100) and downscale factor, applied once
+    # per frame no matter how many viewers are watching
+    app.config['STREAM_JPEG_QUALITY'] = int(os.environ.get('STREAM_JPEG_QUALITY', 95))
+    app.config['STREAM_SCALE'] = float(os.environ.get('STREAM_SCALE', 1.0))
+
+    # /metrics and /profiler answer only loopback clients unless this is '1'
+    app.config['METRICS_ALLOW_REMOTE'] = os.environ.get('METRICS_ALLOW_REMOTE', '0') == '1'
+
+    # Detector backend: 'torch', 'onnx' or 'openvino' (see inference_backends.py).
+    # INFERENCE_WEIGHTS points at the .pt/.onnx file or the OpenVINO model folder;
+    # INFERENCE_THREADS=0 keeps the runtime's default thread count.
+    app.config['INFERENCE_BACKEND'] = os.environ.get('INFERENCE_BACKEND', 'torch')
+    app.config['INFERENCE_WEIGHTS'] = os.environ.get('INFERENCE_WEIGHTS')
+    app.config['INFERENCE_IMGSZ'] = int(os.environ.get('INFERENCE_IMGSZ', 640))
+    app.config['INFERENCE_THREADS'] = int(os.environ.get('INFERENCE_THREADS', 0))
+    app.config['INFERENCE_WARMUP_RUNS'] = int(os.environ.get('INFERENCE_WARMUP_RUNS', 2))
+
+    # Shard cameras across this many detection processes, each with its own
+    # model (0 = run the model in the server process). Threads per worker
+    # default to the core count divided by the number of workers.
+    app.config['DETECTION_WORKERS'] = int(os.environ.get('DETECTION_WORKERS', 0))
+    app.config['DETECTION_WORKER_THREADS'] = int(os.environ.get('DETECTION_WORKER_THREADS', 0))
+
+    # Batch frames from all cameras into one YOLO forward pass
+    app.config['INFERENCE_BATCHING'] = os.environ.get('INFERENCE_BATCHING', '0') == '1'
+    app.config['INFERENCE_MAX_BATCH'] = int(os.environ.get('INFERENCE_MAX_BATCH', 8))
+    app.config['INFERENCE_MAX_WAIT_MS'] = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 10))
+    # Seconds a stopped stream's tracks can be resumed by a reconnect
+    app.config['TRACKER_RESTORE_WINDOW'] = float(os.environ.get('TRACKER_RESTORE_WINDOW', 10.0))
+    # Bounded track history: points kept per track, frames before an unseen
+    # track is evicted, and frames before the same track may alert again
+    app.config['TRACK_HISTORY_LEN'] = int(os.environ.get('TRACK_HISTORY_LEN', 32))
+    app.config['TRACK_TTL_FRAMES'] = int(os.environ.get('TRACK_TTL_FRAMES', 90))
+    app.config['ALERT_COOLDOWN_FRAMES'] = int(os.environ.get('ALERT_COOLDOWN_FRAMES', 900))
+    # Seconds a track must stay inside a polygon zone before a dwell event
+    app.config['ZONE_DWELL_SECONDS'] = float(os.environ.get('ZONE_DWELL_SECONDS', 10.0))
+    # Consecutive frames a track must stay in (or out of) a zone before enter/leave fires
+    app.config['ZONE_CONFIRM_FRAMES'] = int(os.environ.get('ZONE_CONFIRM_FRAMES', 3))
+    # Frames a track may go unseen inside a zone before it counts as having left
+    # (the tracker's max_age: after that its ID is gone for good)
+    app.config['ZONE_LOST_FRAMES'] = int(os.environ.get('ZONE_LOST_FRAMES', 30))
+
+    # Background snapshot/event writer: queue bound, rows per transaction, and
+    # what a full queue does ('block' waits up to EVENT_BLOCK_MS, 'shed' drops)
+    app.config['EVENT_QUEUE_SIZE'] = int(os.environ.get('EVENT_QUEUE_SIZE', 64))
+    app.config['EVENT_BATCH_SIZE'] = int(os.environ.get('EVENT_BATCH_SIZE', 32))
+    app.config['EVENT_OVERFLOW'] = os.environ.get('EVENT_OVERFLOW', 'block')
+    app.config['EVENT_BLOCK_MS'] = float(os.environ.get('EVENT_BLOCK_MS', 50))
+    # Snapshot enhancement: processes in the pool and how many distinct
+    # images may wait before /enhance_snap answers 503
+    app.config['ENHANCE_WORKERS'] = int(os.environ.get('ENHANCE_WORKERS', 1))
+    app.config['ENHANCE_MAX_PENDING'] = int(os.environ.get('ENHANCE_MAX_PENDING', 16))
+    # Default enhancement preset: 'quality' (full NL-means and face pass) or
+    # 'fast' (lighter denoise on parallel tiles, no face pass)
+    app.config['ENHANCE_MODE'] = os.environ.get('ENHANCE_MODE', 'quality')
+    # Enhance only the stored intruder box (grown by this fraction of its size)
+    # at full cost, and the rest of the frame with a cheap pass
+    app.config['ENHANCE_ROI'] = os.environ.get('ENHANCE_ROI', '1') == '1'
+    app.config['ENHANCE_ROI_MARGIN'] = float(os.environ.get('ENHANCE_ROI_MARGIN', 0.25))
+    # Snapshot gallery thumbnails: width in pixels, 'webp' or 'jpg', encoder quality
+    app.config['THUMBNAIL_WIDTH'] = int(os.environ.get('THUMBNAIL_WIDTH', 320))
+    app.config['THUMBNAIL_FORMAT'] = os.environ.get('THUMBNAIL_FORMAT', 'webp')
+    app.config['THUMBNAIL_QUALITY'] = int(os.environ.get('THUMBNAIL_QUALITY', 70))
+
+    # Skip YOLO when nothing moves near the fence: fraction of changed pixels
+    # needed to run the model, and the longest run of skipped frames allowed
+    app.config['MOTION_GATING'] = os.environ.get('MOTION_GATING', '0') == '1'
+    app.config['MOTION_THRESHOLD'] = float(os.environ.get('MOTION_THRESHOLD', 0.002))
+    # Minimum gray-level change per pixel; raised automatically on noisy cameras
+    app.config['MOTION_PIXEL_DELTA'] = float(os.environ.get('MOTION_PIXEL_DELTA', 8))
+    app.config['MOTION_MAX_SKIP_FRAMES'] = int(os.environ.get('MOTION_MAX_SKIP_FRAMES', 30))
+
+    # Run the model only on a crop around the fence (margin is a fraction of
+    # the frame's longer side); ROI_TILE_SIZE > 0 splits large crops into tiles
+    app.config['ROI_INFERENCE'] = os.environ.get('ROI_INFERENCE', '0') == '1'
+    app.config['ROI_MARGIN'] = float(os.environ.get('ROI_MARGIN', 0.1))
+    app.config['ROI_TILE_SIZE'] = int(os.environ.get('ROI_TILE_SIZE', 0))
+
+    # Adaptive quality: per camera, trade input size, detection stride and
+    # confidence (within these bounds) to keep up with QUALITY_TARGET_FPS
+    app.config['QUALITY_CONTROL'] = os.environ.get('QUALITY_CONTROL', '0') == '1'
+    app.config['QUALITY_TARGET_FPS'] = float(os.environ.get('QUALITY_TARGET_FPS', 10.0))
+    app.config['QUALITY_IMGSZ_MIN'] = int(os.environ.get('QUALITY_IMGSZ_MIN', 320))
+    app.config['QUALITY_MAX_STRIDE'] = int(os.environ.get('QUALITY_MAX_STRIDE', 4))
+    app.config['QUALITY_CONF_MIN'] = float(os.environ.get('QUALITY_CONF_MIN', 0.25))
+    app.config['QUALITY_CONF_MAX'] = float(os.environ.get('QUALITY_CONF_MAX', 0.5))
+
     # Initialize extensions
     db.init_app(app)
     
@@ -22,9 +122,10 @@ def create_app():
     # Register blueprints
     app.register_blueprint(routes_bp)
 
-    # Initialize detection manager
-    from routes import init_detection_manager
-    init_detection_manager(app)
+    # Initialize detection manager (maintenance commands run without the model)
+    if with_detection:
+        from routes import init_detection_manager
+        init_detection_manager(app)
 
     # Create database tables (only for development)
     with app.app_context():
@@ -32,6 +133,82 @@ def create_app():
 
     return app
 
+def start_stream_server(app):
+    """Starts the async MJPEG server next to the Flask app if STREAM_SERVER_PORT is set."""
+    if not app.config['STREAM_SERVER_PORT']:
+        return None
+    import routes
+    from stream_server import AsyncStreamServer
+    server = AsyncStreamServer(routes.pipeline_manager, port=app.config['STREAM_SERVER_PORT'])
+    server.start()
+    return server
+
+
+def run_thumbnail_backfill(app, overwrite=False):
+    """Creates gallery thumbnails for snapshots saved before thumbnails existed."""
+    from models import FenceCrossEvent
+    from thumbnails import Thumbnailer
+    thumbnailer = Thumbnailer(
+        app.static_folder,
+        width=app.config['THUMBNAIL_WIDTH'],
+        fmt=app.config['THUMBNAIL_FORMAT'],
+        quality=app.config['THUMBNAIL_QUALITY'],
+    )
+    with app.app_context():
+        # Stream the paths rather than loading every event row
+        paths = db.session.query(FenceCrossEvent.image_path).execution_options(yield_per=500)
+        created, skipped, failed = thumbnailer.backfill((path for (path,) in paths), overwrite=overwrite)
+    print(f"[INFO] Thumbnails: {created} created, {skipped} already present, {failed} failed")
+
+
+def run_monitor(app):
+    """Headless mode: enforce every fence with no web server or viewers."""
+    import routes
+    routes.pipeline_manager.start_supervisor(app.config['MONITOR_INTERVAL'])
+    stream_server = start_stream_server(app)
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        print("[INFO] Shutting down monitor")
+    finally:
+        # Stop the server first so no stream is attached while pipelines shut down
+        if stream_server is not None:
+            stream_server.stop()
+        routes.pipeline_manager.stop_all()
+
+
 if __name__ == '__main__':
-    app = create_app()
-    app.run(host = "0.0.0.0", debug=True)
+    parser = argparse.ArgumentParser(description="Virtual fencing server")
+    parser.add_argument('command', nargs='?', default='serve', choices=['serve', 'monitor', 'thumbnails'],
+                        help="'serve' runs the web UI, 'monitor' runs headless detection only "
+                             "(plus the async stream server if STREAM_SERVER_PORT is set), "
+                             "'thumbnails' backfills gallery thumbnails for existing snapshots")
+    parser.add_argument('--no-monitor', action='store_true',
+                        help="serve only: run detection just while a browser is watching")
+    parser.add_argument('--overwrite', action='store_true',
+                        help="thumbnails only: regenerate thumbnails that already exist")
+    args = parser.parse_args()
+
+    if args.command == 'thumbnails':
+        run_thumbnail_backfill(create_app(with_detection=False), overwrite=args.overwrite)
+        raise SystemExit(0)
+
+    if args.command == 'monitor':
+        run_monitor(create_app())
+    else:
+        # With the debug reloader only the child process serves requests, so
+        # only it loads the model, the detection workers and the cameras
+        reloader_child = os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+        app = create_app(with_detection=reloader_child)
+        stream_server = None
+        if reloader_child:
+            stream_server = start_stream_server(app)
+            if not args.no_monitor:
+                import routes
+                routes.pipeline_manager.start_supervisor(app.config['MONITOR_INTERVAL'])
+        try:
+            app.run(host = "0.0.0.0", debug=True)
+        finally:
+            if stream_server is not None:
+                stream_server.stop()
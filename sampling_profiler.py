@@ -0,0 +1,99 @@
+# sampling_profiler.py
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that can be switched on in a running server. A
+    background thread snapshots every thread's Python stack each `interval`
+    seconds and counts identical stacks; nothing is traced between samples,
+    so the cost is bounded by the sampling rate.
+
+    report() returns the counts in collapsed-stack format
+    ("thread;file:function;... count"), which flamegraph.pl and speedscope
+    read directly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stacks = Counter()
+        self._thread = None
+        self._stop = threading.Event()
+        self.interval = 0.005
+        self.samples = 0
+        self.started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=0.005):
+        with self._lock:
+            if self.running:
+                return False
+            self.interval = max(0.001, float(interval))
+            self._stacks = Counter()
+            self.samples = 0
+            self.started_at = time.time()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        print(f"[INFO] Sampling profiler started ({self.interval * 1000:.0f} ms interval)")
+        return True
+
+    def stop(self):
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None:
+            return False
+        self._stop.set()
+        thread.join(timeout=2.0)
+        print(f"[INFO] Sampling profiler stopped after {self.samples} samples")
+        return True
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            sample = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < 64:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                sample.append(';'.join(reversed(stack)))
+            # Stacks are walked outside the lock; only the counter update holds it
+            with self._lock:
+                self._stacks.update(sample)
+                self.samples += 1
+
+    def report(self, limit=0):
+        """Collapsed stacks, most frequent first; `limit` > 0 keeps only the top N."""
+        with self._lock:
+            stacks = self._stacks.most_common(limit or None)
+        return '\n'.join(f"{stack} {count}" for stack, count in stacks) + '\n'
+
+    def stats(self):
+        with self._lock:
+            samples, distinct = self.samples, len(self._stacks)
+        return {
+            'running': self.running,
+            'interval_ms': round(self.interval * 1000, 1),
+            'samples': samples,
+            'distinct_stacks': distinct,
+            'started_at': self.started_at,
+        }
+
+
+# One profiler per process, toggled from the /profiler routes
+PROFILER = SamplingProfiler()
@@ -0,0 +1,207 @@
+# stream_server.py
+
+import asyncio
+import json
+import os
+import threading
+from urllib.parse import unquote, urlsplit, parse_qs
+
+from camera_pipeline import StreamViewer
+
+RESPONSE_HEADER = (
+    b'HTTP/1.1 200 OK\r\n'
+    b'Content-Type: multipart/x-mixed-replace; boundary=frame\r\n'
+    b'Cache-Control: no-cache, private\r\n'
+    b'Pragma: no-cache\r\n'
+    b'Connection: close\r\n\r\n'
+)
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class _CameraFeed:
+    """
+    Bridges one CameraPipeline into the event loop: the pipeline thread
+    signals each publish once, and every waiting client on this loop wakes
+    from the same asyncio.Event.
+    """
+
+    def __init__(self, pipeline, loop):
+        self.pipeline = pipeline
+        self.loop = loop
+        self.clients = 0
+        self.event = asyncio.Event()
+        pipeline.add_listener(self._on_publish)
+
+    def _on_publish(self):
+        # Runs on the pipeline thread: an exception here would end that camera's capture
+        try:
+            self.loop.call_soon_threadsafe(self._wake)
+        except RuntimeError:
+            # The server's loop is already closed; stop listening instead
+            self.close()
+
+    def _wake(self):
+        event, self.event = self.event, asyncio.Event()
+        event.set()
+
+    def close(self):
+        self.pipeline.remove_listener(self._on_publish)
+
+
+class AsyncStreamServer:
+    """
+    MJPEG server on a single asyncio event loop, run beside the Flask app
+    on its own port. Each viewer costs one coroutine and one socket instead
+    of a blocked WSGI thread; the frame bytes themselves are the pipeline's
+    shared chunks, never copied per client.
+
+    Serves GET /video_feed_detect/<cam_id>?fps=&scale= (same parameters as
+    the blueprint route) and GET /stream_stats.
+    """
+
+    def __init__(self, pipeline_manager, host='0.0.0.0', port=5001, write_buffer=256 * 1024):
+        self.pipeline_manager = pipeline_manager
+        self.host = host
+        self.port = port
+        self.write_buffer = write_buffer     # Per-socket high-water mark before a client counts as slow
+        self._feeds = {}        # {CameraPipeline: _CameraFeed}
+        self._loop = None
+        self._thread = None
+        self.clients = 0
+        self.bytes_sent = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="async-stream-server", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        print(f"[INFO] Async stream server listening on {self.host}:{self.port}")
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            # Let every stream run its cleanup: detach its viewer and drop its feed
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+    def stop(self):
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        # Pipelines outlive the server; they must not keep calling into the closed loop
+        for feed in list(self._feeds.values()):
+            feed.close()
+        self._feeds.clear()
+
+    def stats(self):
+        return {
+            'clients': self.clients,
+            'cameras': {feed.pipeline.cam_id: feed.clients for feed in list(self._feeds.values())},
+            'bytes_sent': self.bytes_sent,
+            'rss_mb': round(current_rss_mb(), 1),
+        }
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), timeout=10.0)
+            method, target = request.split(b'\r\n', 1)[0].decode('latin-1').split(' ')[:2]
+            url = urlsplit(target)
+            if method != 'GET':
+                await self._respond(writer, 405, b'Method Not Allowed')
+            elif url.path == '/stream_stats':
+                await self._respond(writer, 200, json.dumps(self.stats()).encode(), 'application/json')
+            elif url.path.startswith('/video_feed_detect/'):
+                await self._stream(writer, unquote(url.path[len('/video_feed_detect/'):]), parse_qs(url.query))
+            else:
+                await self._respond(writer, 404, b'Not Found')
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Server shutdown: the stream's own cleanup has run; end the connection quietly
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, body, content_type='text/plain'):
+        reason = {200: 'OK', 404: 'Not Found', 405: 'Method Not Allowed'}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+
+    def _query_float(self, query, name):
+        try:
+            return float(query[name][0])
+        except (KeyError, ValueError):
+            return None
+
+    async def _stream(self, writer, cam_id, query):
+        # Same limits as the blueprint route
+        max_fps = self._query_float(query, 'fps') or 0.0
+        max_fps = min(max_fps, 60.0) if max_fps > 0 else 0.0
+        scale = self._query_float(query, 'scale')
+        scale = round(min(max(scale, 0.05), 1.0), 2) if scale is not None and scale > 0 else None
+
+        loop = asyncio.get_running_loop()
+        viewer = StreamViewer(scale, max_fps)
+        # acquire() may join a stopping worker, so keep it off the event loop
+        pipeline = await loop.run_in_executor(None, self.pipeline_manager.acquire, cam_id, viewer)
+        feed = self._feeds.get(pipeline)
+        if feed is None:
+            feed = self._feeds[pipeline] = _CameraFeed(pipeline, loop)
+        feed.clients += 1
+        self.clients += 1
+        writer.transport.set_write_buffer_limits(high=self.write_buffer)
+        interval = 1.0 / max_fps if max_fps else 0.0
+        try:
+            writer.write(RESPONSE_HEADER)
+            seq = 0
+            next_due = 0.0
+            while pipeline.running:
+                delay = next_due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                event = feed.event
+                new_seq, chunk = pipeline.wait_for_frame(seq, timeout=0, scale=viewer.scale)
+                if new_seq == seq:
+                    try:
+                        await asyncio.wait_for(event.wait(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if seq:
+                    viewer.skipped += new_seq - seq - 1
+                seq = new_seq
+                if chunk is None:
+                    continue
+                writer.write(chunk)
+                # A slow client parks here; frames published meanwhile are skipped, not queued
+                await writer.drain()
+                viewer.sent += 1
+                self.bytes_sent += len(chunk)
+                next_due = loop.time() + interval
+        finally:
+            self.clients -= 1
+            feed.clients -= 1
+            if feed.clients == 0:
+                feed.close()
+                self._feeds.pop(pipeline, None)
+            self.pipeline_manager.release(pipeline, viewer)
@@ -0,0 +1,89 @@
+# thumbnails.py
+
+import os
+
+import cv2
+
+THUMB_SUBDIR = 'thumbs'
+
+
+class Thumbnailer:
+    """
+    Writes compact gallery thumbnails next to the intrusion snapshots:
+    static/intrusion_snaps/foo.jpg -> static/intrusion_snaps/thumbs/foo.webp.
+    Snapshot names are unique and never rewritten, so a thumbnail never
+    changes once written and can be cached by browsers indefinitely.
+    """
+
+    def __init__(self, static_dir='static', width=320, fmt='webp', quality=70):
+        self.static_dir = static_dir
+        self.width = width
+        self.fmt = fmt if fmt in ('webp', 'jpg') else 'webp'
+        quality_flag = cv2.IMWRITE_WEBP_QUALITY if self.fmt == 'webp' else cv2.IMWRITE_JPEG_QUALITY
+        self.params = [quality_flag, int(quality)]
+        self.written = 0
+        self.failed = 0
+
+    def thumb_path(self, image_path):
+        """Thumbnail path relative to the static folder (forward slashes, like image_path)."""
+        folder, name = os.path.split(image_path.replace('\\', '/'))
+        thumb_name = f"{os.path.splitext(name)[0]}.{self.fmt}"
+        return '/'.join(part for part in (folder, THUMB_SUBDIR, thumb_name) if part)
+
+    def _full_path(self, relative_path):
+        return os.path.join(self.static_dir, *relative_path.split('/'))
+
+    def write(self, image, image_path):
+        """Downscales an already decoded snapshot; returns the thumbnail path or None."""
+        thumb_path = self.thumb_path(image_path)
+        full_path = self._full_path(thumb_path)
+        height, width = image.shape[:2]
+        if width > self.width:
+            # INTER_AREA averages the dropped pixels instead of aliasing them
+            size = (self.width, max(1, round(height * self.width / width)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Write then rename, so a request never serves a half-written file
+        tmp_path = f"{full_path}.tmp.{os.getpid()}"
+        ok, data = cv2.imencode(f".{self.fmt}", image, self.params)
+        if not ok:
+            self.failed += 1
+            return None
+        with open(tmp_path, 'wb') as f:
+            f.write(data.tobytes())
+        os.replace(tmp_path, full_path)
+        self.written += 1
+        return thumb_path
+
+    def from_file(self, image_path):
+        """Generates the thumbnail from the snapshot on disk; returns its path or None."""
+        image = cv2.imread(self._full_path(image_path.replace('\\', '/')), cv2.IMREAD_COLOR)
+        if image is None:
+            self.failed += 1
+            return None
+        return self.write(image, image_path)
+
+    def ensure(self, image_path):
+        """Returns the thumbnail path, generating it first if it is missing."""
+        thumb_path = self.thumb_path(image_path)
+        if os.path.exists(self._full_path(thumb_path)):
+            return thumb_path
+        return self.from_file(image_path)
+
+    def backfill(self, image_paths, overwrite=False):
+        """Generates thumbnails for existing snapshots; returns (created, skipped, failed)."""
+        created = skipped = failed = 0
+        for image_path in image_paths:
+            if not image_path:
+                continue
+            if not overwrite and os.path.exists(self._full_path(self.thumb_path(image_path))):
+                skipped += 1
+            elif self.from_file(image_path) is None:
+                failed += 1
+                print(f"[WARN] Could not create thumbnail for {image_path}")
+            else:
+                created += 1
+        return created, skipped, failed
+
+    def stats(self):
+        return {'format': self.fmt, 'width': self.width, 'written': self.written, 'failed': self.failed}
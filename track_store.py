@@ -0,0 +1,124 @@
+# track_store.py
+
+import numpy as np
+
+
+class TrackStore:
+    """
+    Compact, bounded track history for one camera.
+
+    Every track gets a slot in preallocated NumPy arrays holding a fixed-length
+    ring buffer of its recent foot points. Tracks not seen for `ttl_frames`
+    are evicted and their slot is reused, and an alerted track may alert again
+    once `alert_cooldown` frames have passed, so memory stays flat on a 24/7
+    camera no matter how many people walk past.
+    """
+
+    def __init__(self, history=32, ttl_frames=90, alert_cooldown=900, initial_capacity=64):
+        self.history = history
+        self.ttl_frames = ttl_frames
+        self.alert_cooldown = alert_cooldown
+        self.frame = 0
+
+        self._slots = {}            # {track_id: slot index}
+        self._alloc(initial_capacity)
+
+    def _alloc(self, capacity):
+        self.points = np.zeros((capacity, self.history, 2), dtype=np.float32)
+        self.lengths = np.zeros(capacity, dtype=np.int32)       # Valid points per slot (<= history)
+        self.heads = np.zeros(capacity, dtype=np.int32)         # Next write index per ring
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+        self.alerted_at = np.full(capacity, -1, dtype=np.int64)  # -1 = never alerted
+        self.track_ids = np.full(capacity, -1, dtype=np.int64)   # -1 = free slot
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def _grow(self):
+        old_capacity = len(self.lengths)
+        arrays = (self.points, self.lengths, self.heads, self.last_seen, self.alerted_at, self.track_ids)
+        self._alloc(old_capacity * 2)
+        for new, old in zip((self.points, self.lengths, self.heads, self.last_seen,
+                             self.alerted_at, self.track_ids), arrays):
+            new[:old_capacity] = old
+        self._free = list(range(len(self.lengths) - 1, old_capacity - 1, -1))
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, track_id):
+        return track_id in self._slots
+
+    def begin_frame(self):
+        """Advances the frame clock and evicts tracks past their TTL."""
+        self.frame += 1
+        live = self.track_ids >= 0
+        expired = np.flatnonzero(live & (self.frame - self.last_seen > self.ttl_frames))
+        for slot in expired.tolist():
+            del self._slots[int(self.track_ids[slot])]
+            self.track_ids[slot] = -1
+            self.lengths[slot] = 0
+            self.heads[slot] = 0
+            self.alerted_at[slot] = -1
+            self._free.append(slot)
+        return len(expired)
+
+    def _slot_for(self, track_id):
+        slot = self._slots.get(track_id)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._free.pop()
+            self._slots[track_id] = slot
+            self.track_ids[slot] = track_id
+        return slot
+
+    def append(self, track_ids, points):
+        """
+        Records this frame's point for each track.
+
+        Returns (previous_points, has_previous): the (N, 2) point each track
+        had on its last update and a mask of tracks that had one.
+        """
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        slots = np.array([self._slot_for(int(t)) for t in track_ids], dtype=np.int64)
+        if len(slots) == 0:
+            return np.zeros((0, 2), dtype=np.float32), np.zeros(0, dtype=bool)
+
+        has_previous = self.lengths[slots] > 0
+        previous = self.points[slots, (self.heads[slots] - 1) % self.history]
+
+        self.points[slots, self.heads[slots]] = points
+        self.heads[slots] = (self.heads[slots] + 1) % self.history
+        self.lengths[slots] = np.minimum(self.lengths[slots] + 1, self.history)
+        self.last_seen[slots] = self.frame
+        return previous, has_previous
+
+    def path(self, track_id):
+        """The track's stored points, oldest first."""
+        slot = self._slots.get(track_id)
+        if slot is None:
+            return np.zeros((0, 2), dtype=np.float32)
+        length, head = self.lengths[slot], self.heads[slot]
+        order = (np.arange(head - length, head)) % self.history
+        return self.points[slot, order].copy()
+
+    def can_alert(self, track_id):
+        slot = self._slots.get(track_id)
+        if slot is None:
+            return True
+        alerted_at = self.alerted_at[slot]
+        return alerted_at < 0 or self.frame - alerted_at >= self.alert_cooldown
+
+    def mark_alerted(self, track_id):
+        self.alerted_at[self._slot_for(track_id)] = self.frame
+
+    def memory_bytes(self):
+        """Bytes held by the preallocated arrays plus the id->slot index."""
+        arrays = (self.points, self.lengths, self.heads, self.last_seen, self.alerted_at, self.track_ids)
+        return int(sum(a.nbytes for a in arrays)) + len(self._slots) * 16
+
+    def stats(self):
+        return {
+            'tracks': len(self._slots),
+            'capacity': len(self.lengths),
+            'memory_bytes': self.memory_bytes(),
+        }
@@ -0,0 +1,160 @@
+# tracker.py
+
+import numpy as np
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between two (N, 4) and (M, 4) xyxy arrays, as an (N, M) array."""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = inter_w * inter_h
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return (inter / np.maximum(union, 1e-6)).astype(np.float32)
+
+
+def greedy_match(iou, threshold):
+    """
+    Greedy assignment on an IoU matrix: repeatedly takes the best remaining
+    pair above `threshold`. Returns (row_indices, col_indices).
+    """
+    rows, cols = [], []
+    if iou.size == 0:
+        return np.array(rows, dtype=int), np.array(cols, dtype=int)
+
+    scores = np.where(iou >= threshold, iou, -1.0)
+    for _ in range(min(scores.shape)):
+        flat = int(np.argmax(scores))
+        r, c = divmod(flat, scores.shape[1])
+        if scores[r, c] < 0:
+            break
+        rows.append(r)
+        cols.append(c)
+        scores[r, :] = -1.0
+        scores[:, c] = -1.0
+    return np.array(rows, dtype=int), np.array(cols, dtype=int)
+
+
+class ByteTracker:
+    """
+    Lightweight ByteTrack/SORT-style multi-object tracker.
+
+    Track state lives in flat NumPy arrays (one row per track) so prediction
+    and association are matrix operations. Each camera owns its own instance,
+    which keeps IDs from different cameras fully independent.
+    """
+
+    def __init__(self, high_thresh=0.5, low_thresh=0.1, match_iou=0.3, max_age=30, velocity_smoothing=0.6):
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.match_iou = match_iou
+        self.max_age = max_age                    # Frames a lost track survives before removal
+        self.velocity_smoothing = velocity_smoothing
+        self.reset()
+
+    def reset(self):
+        self.boxes = np.zeros((0, 4), dtype=np.float32)       # Last estimated xyxy per track
+        self.velocity = np.zeros((0, 4), dtype=np.float32)    # Per-frame box delta per track
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.age = np.zeros(0, dtype=np.int32)                # Frames since last matched
+        self.next_id = 1
+        self.frame_count = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def predict(self):
+        """Advances every track one frame with its constant-velocity model."""
+        self.boxes = self.boxes + self.velocity
+        self.age = self.age + 1
+
+    def update(self, boxes, scores):
+        """
+        Consumes raw detections for one frame.
+
+        `boxes` is an (N, 4) xyxy array and `scores` an (N,) array.
+        Returns (boxes, ids, scores) for the tracks matched in this frame.
+        """
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        self.frame_count += 1
+        self.predict()
+
+        high = scores >= self.high_thresh
+        low = (scores >= self.low_thresh) & ~high
+        high_idx = np.flatnonzero(high)
+        low_idx = np.flatnonzero(low)
+
+        # First pass: confident detections against every track
+        track_rows, det_cols = greedy_match(iou_matrix(self.boxes, boxes[high_idx]), self.match_iou)
+        matched_tracks = track_rows
+        matched_dets = high_idx[det_cols]
+
+        # Second pass: low-score detections rescue tracks left unmatched
+        remaining = np.setdiff1d(np.arange(len(self.ids)), matched_tracks)
+        if len(remaining) and len(low_idx):
+            rows, cols = greedy_match(iou_matrix(self.boxes[remaining], boxes[low_idx]), self.match_iou)
+            matched_tracks = np.concatenate([matched_tracks, remaining[rows]])
+            matched_dets = np.concatenate([matched_dets, low_idx[cols]])
+
+        if len(matched_tracks):
+            new_boxes = boxes[matched_dets]
+            # Velocity is measured against the last observed box, not the prediction
+            gap = np.maximum(self.age[matched_tracks], 1)[:, None]
+            observed = self.boxes[matched_tracks] - self.velocity[matched_tracks] * gap
+            measured = (new_boxes - observed) / gap
+            a = self.velocity_smoothing
+            self.velocity[matched_tracks] = a * self.velocity[matched_tracks] + (1 - a) * measured
+            self.boxes[matched_tracks] = new_boxes
+            self.scores[matched_tracks] = scores[matched_dets]
+            self.age[matched_tracks] = 0
+
+        # Unmatched confident detections start new tracks
+        new_idx = np.setdiff1d(high_idx, matched_dets)
+        if len(new_idx):
+            count = len(new_idx)
+            self.boxes = np.vstack([self.boxes, boxes[new_idx]])
+            self.velocity = np.vstack([self.velocity, np.zeros((count, 4), dtype=np.float32)])
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + count)])
+            self.scores = np.concatenate([self.scores, scores[new_idx]])
+            self.age = np.concatenate([self.age, np.zeros(count, dtype=np.int32)])
+            self.next_id += count
+
+        # Drop tracks that have been lost for too long
+        keep = self.age <= self.max_age
+        if not keep.all():
+            self.boxes, self.velocity = self.boxes[keep], self.velocity[keep]
+            self.ids, self.scores, self.age = self.ids[keep], self.scores[keep], self.age[keep]
+
+        active = self.age == 0
+        return self.boxes[active].copy(), self.ids[active].copy(), self.scores[active].copy()
+
+    def snapshot(self):
+        """Returns a copy of the full tracker state, e.g. before a stream reconnects."""
+        return {
+            'boxes': self.boxes.copy(),
+            'velocity': self.velocity.copy(),
+            'ids': self.ids.copy(),
+            'scores': self.scores.copy(),
+            'age': self.age.copy(),
+            'next_id': self.next_id,
+            'frame_count': self.frame_count,
+        }
+
+    def restore(self, state):
+        """Restores a state produced by `snapshot()`."""
+        self.boxes = state['boxes'].copy()
+        self.velocity = state['velocity'].copy()
+        self.ids = state['ids'].copy()
+        self.scores = state['scores'].copy()
+        self.age = state['age'].copy()
+        self.next_id = state['next_id']
+        self.frame_count = state['frame_count']
@@ -0,0 +1,133 @@
+# zones.py
+
+import time
+import cv2
+import numpy as np
+
+
+class ZoneMask:
+    """
+    Polygon intrusion zones rasterised into one label mask at the stream's
+    native resolution: 0 is outside every zone, k is zones[k - 1]. Where
+    zones overlap, the later zone wins. Point-in-zone is a single array index
+    per point, independent of polygon complexity.
+    """
+
+    def __init__(self, zones, width, height):
+        self.zones = zones
+        self.width = width
+        self.height = height
+        self.mask = np.zeros((height, width), dtype=np.uint8 if len(zones) < 255 else np.uint16)
+        for label, zone in enumerate(zones, start=1):
+            points = np.asarray(zone['points'], dtype=np.float32).reshape(-1, 2)
+            # Zones drawn against a different resolution are rescaled once here
+            src_w, src_h = zone.get('frame_width'), zone.get('frame_height')
+            if src_w and src_h and (src_w, src_h) != (width, height):
+                points *= np.array([width / src_w, height / src_h], dtype=np.float32)
+            cv2.fillPoly(self.mask, [np.round(points).astype(np.int32)], label)
+
+    def lookup(self, points):
+        """Zone labels for an (N, 2) array of x, y points."""
+        points = np.asarray(points).reshape(-1, 2)
+        xs = np.clip(points[:, 0].astype(np.int64), 0, self.width - 1)
+        ys = np.clip(points[:, 1].astype(np.int64), 0, self.height - 1)
+        return self.mask[ys, xs]
+
+    def draw(self, image, color=(0, 165, 255), thickness=2):
+        for zone in self.zones:
+            points = np.asarray(zone['points'], dtype=np.float32).reshape(-1, 2)
+            src_w, src_h = zone.get('frame_width'), zone.get('frame_height')
+            if src_w and src_h:
+                points *= np.array([self.width / src_w, self.height / src_h], dtype=np.float32)
+            cv2.polylines(image, [np.round(points).astype(np.int32)], True, color, thickness)
+
+
+class ZoneMonitor:
+    """
+    Turns per-frame zone lookups for each track into enter, leave and dwell
+    events for one camera. The mask is rebuilt only when the zone list or
+    the frame size changes.
+
+    A track only changes zone once its foot point has stayed in the new zone
+    (or outside every zone) for `confirm_frames` consecutive frames, so box
+    jitter on a zone edge does not produce a burst of enter/leave events.
+
+    A track that disappears while inside a zone (it walked out of view or
+    the detector lost it) gets a zone_leave at its last foot point once it
+    has been missing for `lost_frames` frames, the tracker's max_age, after
+    which its ID can no longer come back.
+    """
+
+    def __init__(self, dwell_seconds=10.0, ttl_frames=90, confirm_frames=3, lost_frames=30):
+        self.dwell_seconds = dwell_seconds
+        self.ttl_frames = ttl_frames
+        self.confirm_frames = max(1, confirm_frames)
+        self.lost_frames = lost_frames
+        self.zone_mask = None
+        self._zones = None
+        self._frame = 0
+        # {track_id: [label, entered_at, dwell_reported, last_seen_frame,
+        #             candidate_label, candidate_frames, candidate_since, last_point]}
+        self._state = {}
+
+    def set_zones(self, zones, width, height):
+        """Rebuilds the label mask if the zones or the resolution changed."""
+        if zones is self._zones and self.zone_mask is not None \
+                and (self.zone_mask.width, self.zone_mask.height) == (width, height):
+            return
+        self._zones = zones
+        self.zone_mask = ZoneMask(zones or [], width, height)
+        self._state.clear()
+
+    def update(self, track_ids, foot_points, now=None):
+        """
+        Returns a list of (track_id, zone, event_type, point) tuples where
+        event_type is 'zone_enter', 'zone_leave' or 'zone_dwell'. A leave for
+        a track that is no longer tracked carries its last seen point.
+        """
+        self._frame += 1
+        now = time.monotonic() if now is None else now
+        events = []
+        if self.zone_mask is None or not self._zones:
+            return events
+
+        zones = self.zone_mask.zones
+        labels = self.zone_mask.lookup(foot_points)
+        for track_id, label, point in zip(track_ids.tolist(), labels.tolist(), foot_points):
+            state = self._state.get(track_id)
+            previous = state[0] if state else 0
+            if label != previous:
+                if state is None:
+                    state = self._state[track_id] = [0, now, False, self._frame, 0, 0, now, point]
+                state[3] = self._frame
+                state[7] = point
+                if label != state[4]:
+                    state[4:7] = [label, 0, now]
+                state[5] += 1
+                if state[5] < self.confirm_frames:
+                    continue
+                if previous:
+                    events.append((track_id, zones[previous - 1], 'zone_leave', point))
+                if label:
+                    events.append((track_id, zones[label - 1], 'zone_enter', point))
+                # Dwell time counts from the first frame spent in the new zone
+                state[:] = [label, state[6], False, self._frame, label, 0, state[6], point]
+            elif state is None:
+                continue
+            else:
+                state[3] = self._frame
+                state[4:6] = [label, 0]
+                state[7] = point
+                if label and not state[2] and now - state[1] >= self.dwell_seconds:
+                    state[2] = True
+                    events.append((track_id, zones[label - 1], 'zone_dwell', point))
+
+        # Tracks gone for good leave their zone; other states are forgotten after the TTL
+        for track_id, state in list(self._state.items()):
+            missing = self._frame - state[3]
+            if state[0] and missing > self.lost_frames:
+                events.append((track_id, zones[state[0] - 1], 'zone_leave', state[7]))
+                del self._state[track_id]
+            elif missing > self.ttl_frames:
+                del self._state[track_id]
+        return events